@@ -0,0 +1,59 @@
+# board_formats.py
+#
+# Copyright (C) 2018 Pawel Jakubowski
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE X CONSORTIUM BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# Except as contained in this notice, the name(s) of the above copyright
+# holders shall not be used in advertising or otherwise to promote the sale,
+# use or other dealings in this Software without prior written
+# authorization.
+
+# File size and load time of a 100k task board saved as json and in the
+# binary format.
+import os
+import json
+import time
+import tempfile
+
+import kanban_src
+from kanban import binary_board
+from kanban.settings import encode_board, decode_board
+
+
+def measure(filename):
+    best = None
+    for _ in range(3):
+        start = time.perf_counter()
+        decode_board(binary_board.read_any(filename))
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print("%-6s %10d bytes %8.3f s" % (
+        os.path.splitext(filename)[1], os.path.getsize(filename), best))
+
+
+if __name__ == "__main__":
+    data = encode_board(kanban_src.make_board("Benchmark"))
+    with tempfile.TemporaryDirectory() as tmp:
+        for extension in (".json", binary_board.EXTENSION):
+            filename = os.path.join(tmp, "Benchmark" + extension)
+            with open(filename, "wb") as f:
+                f.write(binary_board.dumps_any(filename, data))
+            measure(filename)
@@ -0,0 +1,54 @@
+# decode_board.py
+#
+# Copyright (C) 2018 Pawel Jakubowski
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE X CONSORTIUM BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# Except as contained in this notice, the name(s) of the above copyright
+# holders shall not be used in advertising or otherwise to promote the sale,
+# use or other dealings in this Software without prior written
+# authorization.
+
+# Decode throughput of a 100k task board: the schema driven decoder against
+# the object_hook decoder it replaced.
+import json
+import time
+
+import kanban_src
+import legacy_model
+from kanban.settings import encode_board, decode_board
+
+
+def measure(name, decode, text, tasks):
+    best = None
+    for _ in range(3):
+        start = time.perf_counter()
+        decode(text)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print("%-12s %8.3f s %12.0f tasks/s" % (name, best, tasks / best))
+
+
+if __name__ == "__main__":
+    text = json.dumps(encode_board(kanban_src.make_board("Benchmark")))
+    tasks = 100000
+    measure("object_hook", lambda t: json.JSONDecoder(
+        object_hook=legacy_model.decodeBoard).decode(t), text, tasks)
+    measure("schema", lambda t: decode_board(json.loads(t)), text, tasks)
@@ -0,0 +1,53 @@
+# kanban_src.py
+#
+# Copyright (C) 2018 Pawel Jakubowski
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE X CONSORTIUM BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# Except as contained in this notice, the name(s) of the above copyright
+# holders shall not be used in advertising or otherwise to promote the sale,
+# use or other dealings in this Software without prior written
+# authorization.
+
+# Makes the sources importable as the installed 'kanban' package, where all
+# modules live in a single directory
+import os
+import sys
+import types
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+package = types.ModuleType("kanban")
+package.__path__ = [os.path.join(SRC, d) for d in ("model", "", "importer")]
+sys.modules["kanban"] = package
+
+
+def make_board(title, lists=4, tasks=25000):
+    from kanban.Board import Board
+    from kanban.Task import Task
+    board = Board(title)
+    for i in range(lists):
+        tasklist = board.add_new("List %d" % i)
+        for j in range(tasks):
+            task = Task("Task %d in list %d" % (j, i))
+            if j % 3 == 0:
+                task.set_due_date(2018, 1 + j % 12, 1 + j % 28)
+            tasklist.add(task)
+    return board
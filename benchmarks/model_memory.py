@@ -0,0 +1,67 @@
+# model_memory.py
+#
+# Copyright (C) 2018 Pawel Jakubowski
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE X CONSORTIUM BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# Except as contained in this notice, the name(s) of the above copyright
+# holders shall not be used in advertising or otherwise to promote the sale,
+# use or other dealings in this Software without prior written
+# authorization.
+
+# Memory used by a board of 100k tasks, with the dict based model kept in
+# legacy_model.py and with the current model.
+import gc
+import tracemalloc
+
+import kanban_src
+import legacy_model
+from kanban import Board, TaskList, Task
+
+TASKS = 100000
+LISTS = 4
+
+
+def fill(board, tasklist_class, task_class):
+    for i in range(LISTS):
+        tasklist = tasklist_class("List %d" % i)
+        for j in range(TASKS // LISTS):
+            task = task_class("Task %d in list %d" % (j, i))
+            if j % 3 == 0:
+                task.set_due_date(2018, 1 + j % 12, 1 + j % 28)
+            tasklist.add(task)
+        board.add(tasklist)
+    return board
+
+
+def measure(name, board_class, tasklist_class, task_class):
+    gc.collect()
+    tracemalloc.start()
+    board = fill(board_class("Benchmark"), tasklist_class, task_class)
+    size, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print("%-8s %8.1f MB per %d tasks" % (name, size / 2**20, TASKS))
+    return board
+
+
+if __name__ == "__main__":
+    measure("dict", legacy_model.Board, legacy_model.TaskList,
+            legacy_model.Task)
+    measure("slots", Board.Board, TaskList.TaskList, Task.Task)
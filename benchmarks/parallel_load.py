@@ -0,0 +1,78 @@
+# parallel_load.py
+#
+# Copyright (C) 2018 Pawel Jakubowski
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE X CONSORTIUM BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# Except as contained in this notice, the name(s) of the above copyright
+# holders shall not be used in advertising or otherwise to promote the sale,
+# use or other dealings in this Software without prior written
+# authorization.
+
+# Cold start of a configuration with 200 boards, loaded serially and on a
+# process pool of every size up to the number of cpus. Cold means there is
+# no board manifest, so every board has to be decoded.
+import os
+import io
+import time
+import tempfile
+import contextlib
+
+import kanban_src
+from kanban import binary_board
+from kanban.settings import KanbanSettings, encode_board
+
+BOARDS = 200
+
+
+def measure(config_dir, workers):
+    os.remove(os.path.join(config_dir, KanbanSettings.manifest_name))
+    settings = KanbanSettings(config_dir, parallel_load=workers > 0)
+    settings.load_workers = workers
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        if workers > 0:
+            # Also with a single worker, to show the cost of the pool
+            settings.load_files_parallel(
+                [config_dir + f for f in sorted(os.listdir(config_dir))
+                 if f.endswith(".json")])
+        else:
+            settings.load()
+    elapsed = time.perf_counter() - start
+    name = "%d workers" % workers if workers > 0 else "serial"
+    print("%-10s %8.3f s" % (name, elapsed))
+    with open(config_dir + KanbanSettings.manifest_name, "w") as f:
+        f.write("{}")
+
+
+if __name__ == "__main__":
+    print("cpus:", os.cpu_count())
+    with tempfile.TemporaryDirectory() as tmp:
+        config_dir = tmp + "/"
+        for i in range(BOARDS):
+            title = "Board %d" % i
+            data = encode_board(kanban_src.make_board(title, tasks=250))
+            with open(config_dir + title + ".json", "wb") as f:
+                f.write(binary_board.dumps_any(".json", data))
+        with open(config_dir + KanbanSettings.manifest_name, "w") as f:
+            f.write("{}")
+        measure(config_dir, 0)
+        for workers in range(1, (os.cpu_count() or 1) + 1):
+            measure(config_dir, workers)
@@ -0,0 +1,87 @@
+# search.py
+#
+# Copyright (C) 2018 Pawel Jakubowski
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE X CONSORTIUM BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# Except as contained in this notice, the name(s) of the above copyright
+# holders shall not be used in advertising or otherwise to promote the sale,
+# use or other dealings in this Software without prior written
+# authorization.
+
+# Search latency on a board of 100k tasks with titles and descriptions made
+# of words from a 5000 word vocabulary.
+import random
+import time
+
+import kanban_src
+from kanban.Board import Board
+from kanban.Task import Task
+
+TASKS = 100000
+LISTS = 4
+QUERIES = ["a", "ba", "task", "fix bug", "de", "kelo ma", "zzz",
+           "ra vo ti"]
+
+
+def word(rng):
+    return "".join(rng.choice("bdfgklmnprstvz") + rng.choice("aeiou")
+                   for _ in range(rng.randint(1, 3)))
+
+
+def make_board():
+    rng = random.Random(1)
+    words = [word(rng) for _ in range(5000)] + ["task", "fix", "bug"]
+    board = Board("Benchmark")
+    for i in range(LISTS):
+        tasklist = board.add_new("List %d" % i)
+        for j in range(TASKS // LISTS):
+            task = Task(" ".join(rng.choice(words)
+                                 for _ in range(rng.randint(2, 6))))
+            if j % 4 == 0:
+                task.description = " ".join(
+                    rng.choice(words) for _ in range(rng.randint(5, 20)))
+            tasklist.add(task)
+    return board
+
+
+def best_of(f, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        f()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+if __name__ == "__main__":
+    board = make_board()
+    start = time.perf_counter()
+    board.search("")
+    print("index %d tasks %.3f s" % (TASKS, time.perf_counter() - start))
+    for query in QUERIES:
+        elapsed = best_of(lambda: board.search(query), 20)
+        print("%-10s %8.3f ms %3d results" % (
+            repr(query), elapsed * 1000, len(board.search(query))))
+    tasklist = board.tasklists[0]
+    elapsed = best_of(lambda: tasklist.tasks[0].set_title("renamed task"),
+                      20)
+    print("retitle    %8.3f ms" % (elapsed * 1000))
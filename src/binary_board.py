@@ -0,0 +1,230 @@
+# binary_board.py
+#
+# Copyright (C) 2018 Pawel Jakubowski
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE X CONSORTIUM BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# Except as contained in this notice, the name(s) of the above copyright
+# holders shall not be used in advertising or otherwise to promote the sale,
+# use or other dealings in this Software without prior written
+# authorization.
+
+"""Compact binary board format.
+
+A file starts with a fixed header followed by a string index, list
+records, task records and the utf-8 string blob. All records have fixed
+width, so the file can be decoded straight from an mmap:
+
+    header   magic, format version, board version, journal seq,
+             string count, list count, task count
+    strings  (offset, length) into the blob for every string
+    lists    (id string, title string, task count)
+    tasks    (id string, title string, position, creation date,
+              update date, due date ordinal or 0,
+              extra attributes string or NONE)
+
+Format version 1 files have no task positions, version 2 files have no
+ids. Missing ids are stored as NONE.
+
+Equal strings are stored once. Task attributes without a dedicated field
+(e.g. those added by the trello importer) are kept as a json string.
+
+The module only depends on the standard library and can be used as a
+converter: binary_board.py SOURCE DESTINATION
+"""
+
+import os
+import sys
+import json
+import mmap
+import struct
+from datetime import date
+
+EXTENSION = ".kbb"
+MAGIC = b"KNBN"
+FORMAT_VERSION = 3
+NONE = 0xFFFFFFFF
+# Spacing of positions given to tasks which do not have one
+GAP = 1 << 32
+
+HEADER = struct.Struct("<4sHHQIII")
+STRING = struct.Struct("<II")
+LIST = struct.Struct("<III")
+LIST_V2 = struct.Struct("<II")
+TASK = struct.Struct("<IIqddiI")
+TASK_V2 = struct.Struct("<IqddiI")
+TASK_V1 = struct.Struct("<IddiI")
+
+TASK_FIELDS = ("id", "title", "position", "creation_date", "update_date",
+               "due_date")
+
+
+class StringTable:
+
+    def __init__(self):
+        self.index = dict()
+        self.entries = []
+        self.blob = bytearray()
+
+    def add(self, s):
+        i = self.index.get(s)
+        if i is None:
+            data = s.encode("utf-8")
+            i = len(self.entries)
+            self.entries.append((len(self.blob), len(data)))
+            self.blob += data
+            self.index[s] = i
+        return i
+
+    def add_optional(self, s):
+        return self.add(s) if s is not None else NONE
+
+
+def dumps(data):
+    strings = StringTable()
+    strings.add(data["title"])
+    lists = bytearray()
+    tasks = bytearray()
+    task_count = 0
+    for l in data["tasklists"]:
+        lists += LIST.pack(strings.add_optional(l.get("id")),
+                           strings.add(l["title"]), len(l["tasks"]))
+        for i, t in enumerate(l["tasks"]):
+            position = t.get("position")
+            due_date = t.get("due_date")
+            if due_date is not None:
+                due_date = date(due_date["year"], due_date["month"],
+                                due_date["day"]).toordinal()
+            extra = {k: v for k, v in t.items() if k not in TASK_FIELDS}
+            tasks += TASK.pack(
+                strings.add_optional(t.get("id")), strings.add(t["title"]),
+                position if position is not None else i * GAP,
+                t["creation_date"],
+                t.get("update_date", t["creation_date"]), due_date or 0,
+                strings.add(json.dumps(extra)) if len(extra) > 0 else NONE)
+            task_count += 1
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, data.get("version", 1),
+                         data.get("journal_seq", 0), len(strings.entries),
+                         len(data["tasklists"]), task_count)
+    index = b"".join(STRING.pack(*e) for e in strings.entries)
+    return b"".join((header, index, lists, tasks, strings.blob))
+
+
+def loads(buffer):
+    """Decode a board into the same containers json.loads() produces."""
+    with memoryview(buffer) as view:
+        magic, format_version, version, journal_seq, string_count, \
+            list_count, task_count = HEADER.unpack_from(view)
+        if magic != MAGIC or format_version > FORMAT_VERSION:
+            raise RuntimeError("Unsupported binary board format")
+        lists_offset = HEADER.size + string_count * STRING.size
+        list_struct = LIST if format_version > 2 else LIST_V2
+        task_struct = (TASK_V1, TASK_V2, TASK)[min(format_version, 3) - 1]
+        tasks_offset = lists_offset + list_count * list_struct.size
+        blob_offset = tasks_offset + task_count * task_struct.size
+        strings = [str(view[blob_offset + o:blob_offset + o + n], "utf-8")
+                   for o, n in STRING.iter_unpack(
+                       view[HEADER.size:lists_offset])]
+        lists = list(list_struct.iter_unpack(view[lists_offset:tasks_offset]))
+        if format_version < 3:
+            lists = [(NONE,) + l for l in lists]
+        records = task_struct.iter_unpack(view[tasks_offset:blob_offset])
+        # Due dates repeat a lot, decode every ordinal once
+        due_dates = dict()
+        tasklists = []
+        for list_id, title, count in lists:
+            tasks = []
+            for i in range(count):
+                record = next(records)
+                if format_version > 2:
+                    task_id, title_index, position, created, updated, due, \
+                        extra = record
+                elif format_version > 1:
+                    title_index, position, created, updated, due, extra = \
+                        record
+                    task_id = NONE
+                else:
+                    title_index, created, updated, due, extra = record
+                    position = i * GAP
+                    task_id = NONE
+                task = {
+                    "title": strings[title_index],
+                    "position": position,
+                    "creation_date": created,
+                    "update_date": updated,
+                    "due_date": None
+                }
+                if due != 0:
+                    due_date = due_dates.get(due)
+                    if due_date is None:
+                        d = date.fromordinal(due)
+                        due_date = due_dates[due] = {
+                            "year": d.year, "month": d.month, "day": d.day}
+                    task["due_date"] = due_date
+                if task_id != NONE:
+                    task["id"] = strings[task_id]
+                if extra != NONE:
+                    task.update(json.loads(strings[extra]))
+                tasks.append(task)
+            tasklist = {"title": strings[title], "tasks": tasks}
+            if list_id != NONE:
+                tasklist["id"] = strings[list_id]
+            tasklists.append(tasklist)
+        del records
+        return {
+            "title": strings[0],
+            "tasklists": tasklists,
+            "journal_seq": journal_seq,
+            "version": version
+        }
+
+
+def read(filename):
+    with open(filename, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            return loads(m)
+
+
+def read_any(filename):
+    if filename.endswith(EXTENSION):
+        return read(filename)
+    with open(filename, "r") as f:
+        return json.load(f)
+
+
+def dumps_any(filename, data):
+    if filename.endswith(EXTENSION):
+        return dumps(data)
+    return json.dumps(data).encode("utf-8")
+
+
+def convert(source, destination):
+    data = dumps_any(destination, read_any(source))
+    with open(destination, "wb") as f:
+        f.write(data)
+    return len(data)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("usage:", os.path.basename(sys.argv[0]), "SOURCE DESTINATION")
+        print("Converts a board between .json and", EXTENSION, "formats")
+        sys.exit(1)
+    print("written", convert(sys.argv[1], sys.argv[2]), "bytes")
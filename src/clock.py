@@ -0,0 +1,84 @@
+# clock.py
+#
+# Copyright (C) 2018 Pawel Jakubowski
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE X CONSORTIUM BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# Except as contained in this notice, the name(s) of the above copyright
+# holders shall not be used in advertising or otherwise to promote the sale,
+# use or other dealings in this Software without prior written
+# authorization.
+
+from datetime import date
+from gi.repository import GLib
+from .DueIndex import today_ordinal
+
+
+class Clock:
+    """Today's date for every view of the application.
+
+    Rows read today from here instead of asking the system clock each.
+    A single timer fires after local midnight, and observers are then
+    called with the previous and the new day (ordinals). Due priorities
+    only change from one day to the next, so this also covers them.
+    """
+
+    def __init__(self):
+        self.today = today_ordinal()
+        self.observers = []
+        # Labels of due dates by ordinal
+        self.labels = dict()
+        self.timeout_id = 0
+        self.schedule()
+
+    def subscribe(self, observer):
+        self.observers.append(observer)
+
+    def unsubscribe(self, observer):
+        self.observers.remove(observer)
+
+    def schedule(self):
+        now = GLib.DateTime.new_now_local()
+        midnight = GLib.DateTime.new_local(
+            now.get_year(), now.get_month(), now.get_day_of_month(),
+            0, 0, 0).add_days(1)
+        seconds = midnight.difference(now) // GLib.TIME_SPAN_SECOND + 1
+        self.timeout_id = GLib.timeout_add_seconds(seconds, self.on_timeout)
+
+    def on_timeout(self):
+        self.timeout_id = 0
+        # The timer may fire late, e.g. after a suspend
+        today = today_ordinal()
+        if today != self.today:
+            previous = self.today
+            self.today = today
+            for observer in list(self.observers):
+                observer(previous, today)
+        self.schedule()
+        return GLib.SOURCE_REMOVE
+
+    def format_day(self, ordinal):
+        label = self.labels.get(ordinal)
+        if label is None:
+            d = date.fromordinal(ordinal)
+            label = GLib.DateTime.new_local(
+                d.year, d.month, d.day, 0, 0, 0).format("%e %b")
+            self.labels[ordinal] = label
+        return label
@@ -27,24 +27,29 @@
 # authorization.
 
 import json
+from .Task import Task
 
 def import_data(settings, filename):
     print("import", filename)
     with open(filename, "r") as f:
         data = json.load(f)
         board = next(iter(settings.boards.values()))
-        lists = dict()
-        for l in data["lists"]:
-            lists[l["id"]] = l["name"]
-            if l["name"] not in board.tasklists:
-                tasklist = board.add_new(l["name"])
-        for card in data["cards"]:
-            if card["closed"]:
-                continue
-            listname = lists[card["idList"]]
-            tasklist = board.tasklists[listname]
-            task = tasklist.add_new(card["name"])
-            task.description = card["desc"]
-            task.due = card["due"]
-            task.labels = card["labels"]
+        # Observers are notified once, the caller schedules the save
+        with board.batch():
+            lists = dict()
+            for l in data["lists"]:
+                tasklist = board.get_tasklist(l["name"])
+                if tasklist is None:
+                    tasklist = board.add_new(l["name"])
+                lists[l["id"]] = tasklist
+            for card in data["cards"]:
+                if card["closed"]:
+                    continue
+                tasklist = lists[card["idList"]]
+                task = Task(card["name"])
+                task.description = card["desc"]
+                task.due = card["due"]
+                task.labels = card["labels"]
+                # Added complete, so that it is indexed with its description
+                tasklist.add(task)
 
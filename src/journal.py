@@ -0,0 +1,109 @@
+# journal.py
+#
+# Copyright (C) 2018 Pawel Jakubowski
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE X CONSORTIUM BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# Except as contained in this notice, the name(s) of the above copyright
+# holders shall not be used in advertising or otherwise to promote the sale,
+# use or other dealings in this Software without prior written
+# authorization.
+
+import os
+import json
+
+# Number of journaled mutations after which the journal is folded back
+# into the board snapshot
+COMPACT_THRESHOLD = 500
+
+# Every journal line is a JSON list: [seq, operation, list index, ...]
+# Tasks are identified by their position within the list.
+#   [seq, "insert", list, position, task]
+#   [seq, "remove", list, position]
+#   [seq, "move", list, position, new position]
+#   [seq, "title", list, position, title, update_date]
+#   [seq, "due", list, position, due_date or null]
+
+
+def append(path, records):
+    data = "".join(json.dumps(r) + "\n" for r in records).encode("utf-8")
+    with open(path, "ab") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    return len(data)
+
+
+def read(path, after_seq):
+    records = []
+    with open(path, "r") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # The application died while writing this entry
+                print("damaged journal entry ignored in", path)
+                break
+            if record[0] > after_seq:
+                records.append(record)
+    return records
+
+
+def find(tasks, position):
+    # Index of the first task not before position
+    low, high = 0, len(tasks)
+    while low < high:
+        middle = (low + high) // 2
+        if tasks[middle]["position"] < position:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+
+def replay(data, records):
+    """Apply journal records to a board decoded into plain containers."""
+    for record in records:
+        seq, op, list_index, position = record[:4]
+        tasks = data["tasklists"][list_index]["tasks"]
+        if op == "insert":
+            task = record[4]
+            # The task was saved after the insert, it could have moved since
+            task["position"] = position
+            tasks.insert(find(tasks, position), task)
+        else:
+            index = find(tasks, position)
+            if index == len(tasks) or tasks[index]["position"] != position:
+                raise RuntimeError("Journal does not match the board")
+            if op == "remove":
+                del tasks[index]
+            elif op == "move":
+                task = tasks.pop(index)
+                task["position"] = record[4]
+                tasks.insert(find(tasks, record[4]), task)
+            elif op == "title":
+                tasks[index]["title"] = record[4]
+                tasks[index]["update_date"] = record[5]
+            elif op == "due":
+                tasks[index]["due_date"] = record[4]
+            else:
+                raise RuntimeError("Unknown journal operation " + str(op))
+        data["journal_seq"] = seq
+    return data
@@ -100,6 +100,8 @@ class Application(Gtk.Application):
                 b = Board("Work")
                 self.user_settings.boards["Work"] = b
             import_data(self.user_settings, dialog.get_filename())
+            # A new board has no view yet to schedule the save of the batch
+            win.saver.schedule()
             win.draw_board("Work")
             confirmdialog.destroy()
         dialog.destroy()
@@ -117,10 +119,11 @@ class Application(Gtk.Application):
         about_dialog.set_license_type(Gtk.License.MIT_X11)
         about_dialog.present()
 
-    def on_quit(self, param):
-        if self.props.active_window is not None:
-            self.props.active_window.save_board_info()
-            self.props.active_window.user_settings.save()
+    def on_quit(self, *args):
+        win = self.props.active_window
+        if win is not None:
+            win.save_board_info()
+            win.saver.flush()
         self.quit()
 
 def main(version):
@@ -26,13 +26,47 @@
 # use or other dealings in this Software without prior written
 # authorization.
 
+import sys
+from contextlib import contextmanager
 from .TaskList import TaskList
+from .Change import Change
+from .SearchIndex import SearchIndex
+from .DueIndex import DueIndex
 
 class Board:
 
+    __slots__ = ("title", "tasklists", "journal_seq", "objects",
+                 "list_titles", "list_indexes", "search_index",
+                 "unindexed", "due_index", "observers", "_batch_depth", "_batched",
+                 "_dirty", "_snapshot_required", "_journal")
+
     def __init__(self, title):
         self.title = title
         self.tasklists = []
+        # Task lists and tasks of the board by their id
+        self.objects = dict()
+        # Task lists by title (the first one of lists sharing a title) and
+        # index of every list in tasklists by its id
+        self.list_titles = dict()
+        self.list_indexes = dict()
+        # Built by index_tasks() or the first search, kept up to date
+        # afterwards
+        self.search_index = None
+        # Tasks index_tasks() has not reached yet, last one first
+        self.unindexed = None
+        self.due_index = None
+        # Callables receiving a list of Change records after every
+        # modification or batch of modifications
+        self.observers = []
+        self._batch_depth = 0
+        self._batched = []
+        # New boards have never been written to disk
+        self._dirty = True
+        self._snapshot_required = True
+        # Mutations not saved yet, see record()
+        self._journal = []
+        # Sequence number of the latest journaled mutation
+        self.journal_seq = 0
 
     def __str__(self):
         board_str = "=== " + self.title + " ==="
@@ -40,10 +74,190 @@ class Board:
             board_str += "\n" + str(l)
         return board_str
 
+    def __getstate__(self):
+        return {"title": self.title, "tasklists": self.tasklists,
+                "journal_seq": self.journal_seq}
+
+    def __setstate__(self, state):
+        # Used for boards pickled by old versions, their tasklists are a dict
+        self.__init__(state["title"])
+        self.tasklists = state["tasklists"]
+
     def add_new(self, title):
         tasklist = TaskList(title)
         self.add(tasklist)
         return tasklist
 
     def add(self, tasklist):
+        tasklist._board = self
+        for t in tasklist.tasks:
+            t._tasklist = tasklist
+        self.list_titles.setdefault(tasklist.title, tasklist)
+        self.list_indexes[tasklist.id] = len(self.tasklists)
         self.tasklists.append(tasklist)
+        self.index((tasklist,))
+        self.index(tasklist.tasks)
+        self.mark_dirty()
+        self.notify(Change("list-insert", tasklist,
+                           index=len(self.tasklists) - 1,
+                           tasks=list(tasklist.tasks)))
+
+    def remove_tasklist(self, tasklist):
+        index = self.list_indexes[tasklist.id]
+        del self.tasklists[index]
+        tasklist._board = None
+        self.unindex((tasklist,))
+        self.unindex(tasklist.tasks)
+        self.reindex_tasklists()
+        self.mark_dirty()
+        self.notify(Change("list-remove", tasklist, index=index,
+                           tasks=list(tasklist.tasks)))
+
+    def rename_tasklist(self, tasklist, title):
+        # Titles are indexed, lists must not be renamed directly
+        tasklist.title = sys.intern(title)
+        self.reindex_tasklists()
+        self.mark_dirty()
+        self.notify(Change("list-update", tasklist, field="title"))
+
+    def move_tasklist(self, tasklist, index):
+        old_index = self.list_indexes[tasklist.id]
+        del self.tasklists[old_index]
+        self.tasklists.insert(index, tasklist)
+        self.reindex_tasklists()
+        self.mark_dirty()
+        self.notify(Change("list-move", tasklist, index=old_index,
+                           new_index=index))
+
+    def reindex_tasklists(self):
+        self.list_titles = dict()
+        self.list_indexes = dict()
+        for i, l in enumerate(self.tasklists):
+            self.list_titles.setdefault(l.title, l)
+            self.list_indexes[l.id] = i
+
+    def get_tasklist(self, title):
+        """Task list with the given title, None if there is none."""
+        return self.list_titles.get(title)
+
+    def tasklist_index(self, list_id):
+        """Index of the task list in tasklists, None if it is not on the
+        board."""
+        return self.list_indexes.get(list_id)
+
+    def index(self, objects):
+        for o in objects:
+            self.objects[o.id] = o
+
+    def unindex(self, objects):
+        for o in objects:
+            self.objects.pop(o.id, None)
+
+    def subscribe(self, observer):
+        self.observers.append(observer)
+
+    def unsubscribe(self, observer):
+        self.observers.remove(observer)
+
+    def notify(self, change):
+        if self._batch_depth > 0:
+            self._batched.append(change)
+        else:
+            self.notify_all([change])
+
+    def notify_all(self, changes):
+        # Observers may unsubscribe while being notified
+        for observer in list(self.observers):
+            observer(changes)
+
+    @contextmanager
+    def batch(self):
+        """Group modifications made in the with block, observers are
+        notified once with all of them when the outermost block exits."""
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0 and len(self._batched) > 0:
+                changes = self._batched
+                self._batched = []
+                self.notify_all(changes)
+
+    def index_tasks(self, count):
+        """Add up to count tasks to the search index, returns whether
+        tasks are left. Lets views build the index in idle time instead of
+        on the first search."""
+        if self.search_index is None:
+            self.search_index = SearchIndex()
+            self.unindexed = [t for l in reversed(self.tasklists)
+                              for t in reversed(l.tasks)]
+            # Tasks added, removed or edited from now on are indexed by
+            # their changes
+            self.subscribe(self.search_index.on_changes)
+        index = self.search_index
+        unindexed = self.unindexed
+        while count > 0 and len(unindexed) > 0:
+            task = unindexed.pop()
+            if self.objects.get(task.id) is task and task not in index:
+                index.add(task)
+                count -= 1
+        return len(unindexed) > 0
+
+    def search(self, query, limit=50):
+        """Ids of tasks matching query, most relevant first."""
+        # The rest of the tasks, if a view did not index them already
+        self.index_tasks(len(self.objects))
+        return self.search_index.search(query, limit)
+
+    def due(self):
+        """Tasks of the board by due date, see DueIndex."""
+        if self.due_index is None:
+            self.due_index = DueIndex()
+            for l in self.tasklists:
+                for t in l.tasks:
+                    self.due_index.add(t)
+            self.subscribe(self.due_index.on_changes)
+        return self.due_index
+
+    def find(self, id):
+        """Task list or task with the given id, None if there is none."""
+        return self.objects.get(id)
+
+    def find_tasklist(self, task_id):
+        task = self.objects.get(task_id)
+        if task is None:
+            return None
+        return task._tasklist
+
+    def record(self, *op):
+        """Remember a small mutation so that it can be appended to the
+        board journal instead of rewriting the whole board."""
+        if not self._snapshot_required:
+            self._journal.append(op)
+        self._dirty = True
+
+    def is_dirty(self):
+        return self._dirty
+
+    def needs_snapshot(self):
+        return self._snapshot_required
+
+    def journal_length(self):
+        return len(self._journal)
+
+    def take_journal(self):
+        journal = self._journal
+        self._journal = []
+        return journal
+
+    def mark_dirty(self):
+        # Changes that cannot be journaled require the full board to be saved
+        self._dirty = True
+        self._snapshot_required = True
+        self._journal = []
+
+    def mark_clean(self):
+        self._dirty = False
+        self._snapshot_required = False
+        self._journal = []
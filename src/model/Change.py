@@ -0,0 +1,67 @@
+# Change.py
+#
+# Copyright (C) 2018 Pawel Jakubowski
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE X CONSORTIUM BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# Except as contained in this notice, the name(s) of the above copyright
+# holders shall not be used in advertising or otherwise to promote the sale,
+# use or other dealings in this Software without prior written
+# authorization.
+
+class Change:
+    """A single modification of a board, passed to its observers.
+
+    Indexes refer to the positions in the task list (or in the list of
+    task lists of the board) before and after the modification:
+
+        "insert"        task inserted into tasklist at index
+        "remove"        task removed from tasklist, it was at index
+        "move"          task moved within tasklist from index to new_index
+        "update"        field of task changed
+        "list-insert"   tasklist added to the board at index
+        "list-remove"   tasklist removed from the board, it was at index
+        "list-move"     tasklist moved from index to new_index
+        "list-update"   field of tasklist changed
+
+    "update" also gives the index of the task. "list-insert" and
+    "list-remove" carry in tasks the tasks the list had at that moment.
+    Changes of a batch reach observers after the whole batch ran, so they
+    must not look at the current state of the model instead.
+    """
+
+    __slots__ = ("kind", "tasklist", "task", "index", "new_index", "field",
+                 "tasks")
+
+    def __init__(self, kind, tasklist, task=None, index=None, new_index=None,
+                 field=None, tasks=None):
+        self.kind = kind
+        self.tasklist = tasklist
+        self.task = task
+        self.index = index
+        self.new_index = new_index
+        self.field = field
+        self.tasks = tasks
+
+    def __repr__(self):
+        return "Change(%s, %s, %s, %s, %s, %s)" % (
+            self.kind, self.tasklist.title,
+            self.task.title if self.task is not None else None,
+            self.index, self.new_index, self.field)
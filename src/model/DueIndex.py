@@ -0,0 +1,132 @@
+# DueIndex.py
+#
+# Copyright (C) 2018 Pawel Jakubowski
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE X CONSORTIUM BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# Except as contained in this notice, the name(s) of the above copyright
+# holders shall not be used in advertising or otherwise to promote the sale,
+# use or other dealings in this Software without prior written
+# authorization.
+
+from bisect import bisect_left, bisect_right, insort
+from datetime import date
+
+# Priority of a task due in the given number of days, or earlier
+PRIORITIES = ((1, "high"), (2, "medium"), (3, "low"))
+
+
+def today_ordinal():
+    return date.today().toordinal()
+
+
+def due_priority(ordinal, today=None):
+    """Priority of a task due on the day with the given ordinal, None when
+    the due date is far enough."""
+    if today is None:
+        today = today_ordinal()
+    days = ordinal - today
+    for limit, priority in PRIORITIES:
+        if days <= limit:
+            return priority
+    return None
+
+
+class DueIndex:
+    """Tasks with a due date, sorted by it."""
+
+    def __init__(self):
+        # (due date ordinal, task id) of every task with a due date
+        self.keys = []
+        self.ordinals = dict()
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, task):
+        if task.due_date is not None:
+            ordinal = task.due_date.ordinal
+            self.ordinals[task.id] = ordinal
+            insort(self.keys, (ordinal, task.id))
+
+    def remove(self, task):
+        ordinal = self.ordinals.pop(task.id, None)
+        if ordinal is not None:
+            del self.keys[bisect_left(self.keys, (ordinal, task.id))]
+
+    def update(self, task):
+        ordinal = task.due_date.ordinal if task.due_date is not None else None
+        if self.ordinals.get(task.id) != ordinal:
+            self.remove(task)
+            self.add(task)
+
+    def on_changes(self, changes):
+        for change in changes:
+            self.on_change(change)
+
+    def on_change(self, change):
+        if change.kind == "insert":
+            self.add(change.task)
+        elif change.kind == "remove":
+            self.remove(change.task)
+        elif change.kind == "update" and change.field == "due_date":
+            self.update(change.task)
+        elif change.kind == "list-insert":
+            for t in change.tasks:
+                self.add(t)
+        elif change.kind == "list-remove":
+            for t in change.tasks:
+                self.remove(t)
+
+    def first(self):
+        """Ordinal of the earliest due date, None when no task has one."""
+        return self.keys[0][0] if len(self.keys) > 0 else None
+
+    def between(self, first, last):
+        """Ids of tasks due from day first to day last (ordinals), earliest
+        first."""
+        start = bisect_left(self.keys, (first,))
+        end = bisect_right(self.keys, (last + 1,))
+        return [task_id for ordinal, task_id in self.keys[start:end]]
+
+    def priority_changed(self, previous, today):
+        """Ids of tasks whose due_priority on day today (ordinal) is not
+        the one they had on day previous."""
+        first = min(previous, today) + PRIORITIES[0][0] + 1
+        last = max(previous, today) + PRIORITIES[-1][0]
+        return [task_id for task_id in self.between(first, last)
+                if due_priority(self.ordinals[task_id], previous) !=
+                due_priority(self.ordinals[task_id], today)]
+
+    def overdue(self, today=None):
+        if today is None:
+            today = today_ordinal()
+        return self.between(0, today - 1)
+
+    def due_today(self, today=None):
+        if today is None:
+            today = today_ordinal()
+        return self.between(today, today)
+
+    def due_within(self, days, today=None):
+        """Ids of tasks due today or in the next days days."""
+        if today is None:
+            today = today_ordinal()
+        return self.between(today, today + days)
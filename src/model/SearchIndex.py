@@ -0,0 +1,256 @@
+# SearchIndex.py
+#
+# Copyright (C) 2018 Pawel Jakubowski
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE X CONSORTIUM BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# Except as contained in this notice, the name(s) of the above copyright
+# holders shall not be used in advertising or otherwise to promote the sale,
+# use or other dealings in this Software without prior written
+# authorization.
+
+import re
+import heapq
+from itertools import chain
+from bisect import bisect_left, insort
+
+TOKEN = re.compile(r"\w+")
+
+# Relevance of a query term matching a token of a task
+TITLE_TOKEN = 4
+TITLE_PREFIX = 3
+DESCRIPTION_TOKEN = 2
+DESCRIPTION_PREFIX = 1
+
+
+def tokenize(text):
+    if not text:
+        return ()
+    return tuple(dict.fromkeys(TOKEN.findall(text.casefold())))
+
+
+class Field:
+    """Inverted index of one task attribute."""
+
+    __slots__ = ("postings", "vocabulary")
+
+    def __init__(self):
+        # Numbers of tasks by token, in the order the tasks were added
+        self.postings = dict()
+        # Sorted tokens, tokens starting with a prefix are a single range
+        self.vocabulary = []
+
+    def add(self, number, tokens):
+        for token in tokens:
+            numbers = self.postings.get(token)
+            if numbers is None:
+                numbers = self.postings[token] = dict()
+                insort(self.vocabulary, token)
+            numbers[number] = None
+
+    def remove(self, number, tokens):
+        for token in tokens:
+            numbers = self.postings[token]
+            del numbers[number]
+            if len(numbers) == 0:
+                del self.postings[token]
+                del self.vocabulary[bisect_left(self.vocabulary, token)]
+
+    def exact(self, term):
+        return self.postings.get(term, {})
+
+    def prefixed(self, term):
+        # Tokens longer than term starting with it
+        i = bisect_left(self.vocabulary, term)
+        if i < len(self.vocabulary) and self.vocabulary[i] == term:
+            i += 1
+        while i < len(self.vocabulary) and \
+                self.vocabulary[i].startswith(term):
+            yield self.vocabulary[i]
+            i += 1
+
+    def matching(self, term):
+        # Postings of the tokens matching term
+        numbers = self.postings.get(term)
+        if numbers is not None:
+            yield numbers
+        for token in self.prefixed(term):
+            yield self.postings[token]
+
+    def count(self, term, limit):
+        # Number of tasks matching term, counting stops above limit
+        count = len(self.exact(term))
+        for token in self.prefixed(term):
+            if count > limit:
+                break
+            count += len(self.postings[token])
+        return count
+
+
+class SearchIndex:
+    """Full text index of task titles and descriptions.
+
+    Every word of a query matches the words of a task starting with it, so
+    results are found while the query is being typed. Tasks must match all
+    words of the query.
+    """
+
+    def __init__(self):
+        self.title = Field()
+        self.description = Field()
+        # Tasks are numbered in the index, small ints are much cheaper to
+        # hash and compare in the postings than ids
+        self.numbers = dict()
+        self.ids = dict()
+        self.next_number = 0
+        # Indexed tokens of every task by number, (title tokens,
+        # description tokens)
+        self.tokens = dict()
+
+    def __len__(self):
+        return len(self.tokens)
+
+    def __contains__(self, task):
+        return task.id in self.numbers
+
+    def add(self, task):
+        tokens = (tokenize(task.title),
+                  tokenize(getattr(task, "description", None)))
+        number = self.next_number
+        self.next_number += 1
+        self.numbers[task.id] = number
+        self.ids[number] = task.id
+        self.tokens[number] = tokens
+        self.title.add(number, tokens[0])
+        self.description.add(number, tokens[1])
+
+    def remove(self, task):
+        number = self.numbers.pop(task.id, None)
+        if number is not None:
+            del self.ids[number]
+            tokens = self.tokens.pop(number)
+            self.title.remove(number, tokens[0])
+            self.description.remove(number, tokens[1])
+
+    def update(self, task):
+        self.remove(task)
+        self.add(task)
+
+    def on_changes(self, changes):
+        for change in changes:
+            self.on_change(change)
+
+    def on_change(self, change):
+        if change.kind == "insert":
+            self.add(change.task)
+        elif change.kind == "remove":
+            self.remove(change.task)
+        elif change.kind == "update" and change.field in ("title", "description"):
+            self.update(change.task)
+        elif change.kind == "list-insert":
+            for t in change.tasks:
+                self.add(t)
+        elif change.kind == "list-remove":
+            for t in change.tasks:
+                self.remove(t)
+
+    def prefixes(self, term):
+        # Tokens longer than term starting with it, of titles and of
+        # descriptions, see score()
+        return (term, frozenset(self.title.prefixed(term)),
+                frozenset(self.description.prefixed(term)))
+
+    def score(self, number, prefixes):
+        term, title_prefixed, description_prefixed = prefixes
+        title, description = self.tokens[number]
+        if term in title:
+            return TITLE_TOKEN
+        if not title_prefixed.isdisjoint(title):
+            return TITLE_PREFIX
+        if term in description:
+            return DESCRIPTION_TOKEN
+        if not description_prefixed.isdisjoint(description):
+            return DESCRIPTION_PREFIX
+        return 0
+
+    def candidates(self, term):
+        # Tasks matching term, in the order of decreasing relevance
+        seen = set()
+        groups = (
+            (TITLE_TOKEN, (self.title.exact(term),)),
+            (TITLE_PREFIX, (self.title.postings[t]
+                            for t in self.title.prefixed(term))),
+            (DESCRIPTION_TOKEN, (self.description.exact(term),)),
+            (DESCRIPTION_PREFIX, (self.description.postings[t]
+                                  for t in self.description.prefixed(term))))
+        for relevance, postings in groups:
+            for numbers in postings:
+                for number in numbers:
+                    if number not in seen:
+                        seen.add(number)
+                        yield relevance, number
+
+    def matching(self, term):
+        return chain(self.title.matching(term),
+                     self.description.matching(term))
+
+    def search(self, query, limit=50):
+        """Ids of at most limit tasks matching query, most relevant first."""
+        terms = tokenize(query)
+        if len(terms) == 0:
+            return []
+        if len(terms) == 1:
+            # Tasks come in the order of relevance, stop after limit
+            results = []
+            for relevance, number in self.candidates(terms[0]):
+                if len(results) == limit:
+                    break
+                results.append(self.ids[number])
+            return results
+        # Start from the tasks matching the rarest term, the other terms
+        # only narrow them down. Terms matching many more tasks than are
+        # left are cheaper to check by score() below.
+        counted = []
+        smallest = len(self.tokens)
+        for term in terms:
+            count = self.title.count(term, smallest) + \
+                self.description.count(term, smallest)
+            smallest = min(smallest, count)
+            counted.append((count, term))
+        counted.sort()
+        matches = set().union(*self.matching(counted[0][1]))
+        for count, term in counted[1:]:
+            if count > 16 * len(matches):
+                break
+            matches = set().union(*(matches.intersection(numbers)
+                                    for numbers in self.matching(term)))
+        prefixes = [self.prefixes(term) for term in terms]
+        results = []
+        # Ids sort by creation time, older tasks win ties
+        for order, number in enumerate(sorted(matches, key=self.ids.get)):
+            score = 0
+            for term_prefixes in prefixes:
+                term_score = self.score(number, term_prefixes)
+                if term_score == 0:
+                    break
+                score += term_score
+            else:
+                results.append((-score, order, number))
+        return [self.ids[item[2]] for item in heapq.nsmallest(limit, results)]
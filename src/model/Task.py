@@ -26,31 +26,122 @@
 # use or other dealings in this Software without prior written
 # authorization.
 
-from datetime import datetime
+from datetime import datetime, date
+from .ids import new_id, encode_id, decode_id
+from .Change import Change
 
 #TODO use UTC time
 class DueDate:
 
+    __slots__ = ("ordinal",)
+
     def __init__(self, year, month, day):
-        self.year = year
-        self.month = month
-        self.day = day
+        self.ordinal = date(year, month, day).toordinal()
+
+    def __getstate__(self):
+        d = self.to_date()
+        return {"year": d.year, "month": d.month, "day": d.day}
+
+    def __setstate__(self, state):
+        self.__init__(state["year"], state["month"], state["day"])
+
+    def to_date(self):
+        return date.fromordinal(self.ordinal)
+
+    @property
+    def year(self):
+        return self.to_date().year
+
+    @property
+    def month(self):
+        return self.to_date().month
+
+    @property
+    def day(self):
+        return self.to_date().day
 
 class Task:
 
-    def __init__(self, title):
+    # Saved attributes set only by importers
+    optional_attributes = ("description", "due", "labels")
+    attributes = ("id", "title", "creation_date", "update_date", "due_date",
+                  "position") + optional_attributes
+
+    __slots__ = attributes + ("extra", "_tasklist")
+
+    def __init__(self, title, creation_date=None, id=None):
+        # Stable identity, unlike the index of the task within its list
+        self.id = id if id is not None else new_id()
         self.title = title
-        self.creation_date = datetime.now().timestamp()
+        if creation_date is None:
+            creation_date = datetime.now().timestamp()
+        self.creation_date = creation_date
         self.update_date = self.creation_date
         self.due_date = None
+        # Order within the task list, see TaskSequence
+        self.position = None
+        # Saved attributes unknown to this version of the application
+        self.extra = None
+        self._tasklist = None
 
     def __str__(self):
         return "#%s" % self.title
 
+    def __getstate__(self):
+        state = {
+            "id": encode_id(self.id),
+            "title": self.title,
+            "creation_date": self.creation_date,
+            "update_date": self.update_date,
+            "due_date": self.due_date,
+            "position": self.position
+        }
+        for name in self.optional_attributes:
+            if hasattr(self, name):
+                state[name] = getattr(self, name)
+        if self.extra is not None:
+            state.update(self.extra)
+        return state
+
+    def __setstate__(self, state):
+        # Also used for tasks pickled by old versions
+        self.__init__(state["title"], state["creation_date"],
+                      decode_id(state.get("id")))
+        for k, v in state.items():
+            if k not in ("id", "title", "creation_date"):
+                self.set_attribute(k, v)
+
+    def set_attribute(self, name, value):
+        if name in self.attributes:
+            setattr(self, name, value)
+        elif not name.startswith("_"):
+            if self.extra is None:
+                self.extra = dict()
+            self.extra[name] = value
+
+    def record(self, op, *args):
+        if self._tasklist is not None:
+            self._tasklist.record(op, self.position, *args)
+
     def set_title(self, title):
         self.title = title
         self.update_date = datetime.now().timestamp()
+        self.record("title", title, self.update_date)
+        self.notify("title")
 
     def set_due_date(self, year, month, day):
         self.due_date = DueDate(year, month, day)
+        self.record("due", self.due_date)
+        self.notify("due_date")
+
+    def clear_due_date(self):
+        self.due_date = None
+        self.record("due", None)
+        self.notify("due_date")
+
+    def notify(self, field):
+        if self._tasklist is not None:
+            index = self._tasklist.tasks.index(self)
+            self._tasklist.notify(Change("update", self._tasklist, self,
+                                         index, field=field))
 
@@ -26,13 +26,22 @@
 # use or other dealings in this Software without prior written
 # authorization.
 
+import sys
 from .Task import Task
+from .ids import new_id, encode_id, decode_id
+from .Change import Change
+from .TaskSequence import TaskSequence, GAP
 
 class TaskList:
 
-    def __init__(self, title):
-        self.title = title
-        self.tasks = []
+    __slots__ = ("id", "title", "tasks", "_board")
+
+    def __init__(self, title, id=None):
+        self.id = id if id is not None else new_id()
+        # Boards share a handful of list names
+        self.title = sys.intern(title)
+        self.tasks = TaskSequence()
+        self._board = None
 
     def __str__(self):
         list_str = ">" + self.title
@@ -40,16 +49,92 @@ class TaskList:
             list_str += "\n" + str(t)
         return list_str
 
+    def __getstate__(self):
+        return {"id": encode_id(self.id), "title": self.title,
+                "tasks": list(self.tasks)}
+
+    def __setstate__(self, state):
+        # Used for lists pickled by old versions
+        self.__init__(state["title"], decode_id(state.get("id")))
+        self.set_tasks(state["tasks"])
+
+    def set_tasks(self, tasks):
+        """Replace all tasks, tasks without a position keep their order."""
+        if any(t.position is None for t in tasks):
+            for i, t in enumerate(tasks):
+                t.position = i * GAP
+        else:
+            tasks = sorted(tasks, key=lambda t: t.position)
+        for t in tasks:
+            t._tasklist = self
+        if self._board is None:
+            # Decoded lists have no observers to tell
+            self.tasks = TaskSequence(tasks)
+            return
+        old_tasks = list(self.tasks)
+        self._board.unindex(old_tasks)
+        self._board.index(tasks)
+        self.tasks = TaskSequence(tasks)
+        for index in reversed(range(len(old_tasks))):
+            self.notify(Change("remove", self, old_tasks[index], index))
+        for index, task in enumerate(tasks):
+            self.notify(Change("insert", self, task, index))
+
+    def record(self, op, *args):
+        if self._board is not None:
+            index = self._board.tasklist_index(self.id)
+            self._board.record(op, index, *args)
+
+    def notify(self, change):
+        if self._board is not None:
+            self._board.notify(change)
+
     def add_new(self, title):
         task = Task(title)
-        self.tasks.append(task)
+        self.add(task)
         return task
 
     def add(self, task):
-        self.tasks.append(task)
+        self.insert(len(self.tasks), task)
+
+    def place(self, index, task):
+        # Give task a position between the tasks at index - 1 and index
+        position = self.tasks.position_for(index)
+        if position is None:
+            self.tasks.relabel()
+            # Positions of all tasks changed, journal can not express that
+            if self._board is not None:
+                self._board.mark_dirty()
+            position = self.tasks.position_for(index)
+        task.position = position
+        task._tasklist = self
+        self.tasks.insert(task)
 
     def insert(self, index, task):
-        self.tasks.insert(index, task)
+        index = min(index, len(self.tasks))
+        self.place(index, task)
+        if self._board is not None:
+            self._board.index((task,))
+        self.record("insert", task.position, task)
+        self.notify(Change("insert", self, task, index))
 
     def remove(self, index):
-        del self.tasks[index]
+        task = self.tasks[index]
+        self.tasks.remove(task)
+        # Later changes of the task must not be recorded for this list
+        task._tasklist = None
+        if self._board is not None:
+            self._board.unindex((task,))
+        self.record("remove", task.position)
+        self.notify(Change("remove", self, task, index))
+        return task
+
+    def move(self, index, new_index):
+        """Move a task within the list, only its position changes."""
+        task = self.tasks[index]
+        position = task.position
+        self.tasks.remove(task)
+        self.place(new_index, task)
+        self.record("move", position, task.position)
+        self.notify(Change("move", self, task, index, new_index))
+        return task
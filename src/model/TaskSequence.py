@@ -0,0 +1,190 @@
+# TaskSequence.py
+#
+# Copyright (C) 2018 Pawel Jakubowski
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE X CONSORTIUM BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# Except as contained in this notice, the name(s) of the above copyright
+# holders shall not be used in advertising or otherwise to promote the sale,
+# use or other dealings in this Software without prior written
+# authorization.
+
+from bisect import bisect_left
+
+# Distance between positions of neighbouring tasks after relabel()
+GAP = 1 << 32
+# Blocks are split when they grow over twice this size
+LOAD = 256
+
+
+class TaskSequence:
+    """Tasks ordered by their integer position.
+
+    Tasks are kept in sorted blocks of bounded size with a binary indexed
+    tree over block lengths - a two level balanced tree. Inserting or
+    removing a task and finding it by index or by position take O(log n)
+    plus a shift inside a single block. Positions are spaced by GAP, so a
+    task can usually be placed between two others by giving it a
+    position in between without touching any other task.
+    """
+
+    __slots__ = ("blocks", "keys", "maxes", "tree", "length")
+
+    def __init__(self, tasks=()):
+        # tasks must be sorted by position
+        tasks = list(tasks)
+        self.blocks = [tasks[i:i + LOAD] for i in range(0, len(tasks), LOAD)]
+        self.length = len(tasks)
+        self.update_keys()
+
+    def update_keys(self):
+        # Positions of tasks in every block, for bisection
+        self.keys = [[t.position for t in b] for b in self.blocks]
+        self.maxes = [k[-1] for k in self.keys]
+        self.tree = None
+
+    def __len__(self):
+        return self.length
+
+    def __iter__(self):
+        for block in self.blocks:
+            yield from block
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.length
+        if index < 0 or index >= self.length:
+            raise IndexError("task index out of range")
+        block, offset = self.locate(index)
+        return self.blocks[block][offset]
+
+    # Binary indexed tree over block lengths
+    def build_tree(self):
+        tree = [0] + [len(b) for b in self.blocks]
+        for i in range(1, len(tree)):
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self.tree = tree
+
+    def count_before(self, block):
+        if self.tree is None:
+            self.build_tree()
+        count = 0
+        while block > 0:
+            count += self.tree[block]
+            block -= block & -block
+        return count
+
+    def update_tree(self, block, delta):
+        if self.tree is None:
+            return
+        block += 1
+        while block < len(self.tree):
+            self.tree[block] += delta
+            block += block & -block
+
+    def locate(self, index):
+        if self.tree is None:
+            self.build_tree()
+        block = 0
+        step = 1 << (len(self.tree) - 1).bit_length()
+        while step > 0:
+            if block + step < len(self.tree) and self.tree[block + step] <= index:
+                block += step
+                index -= self.tree[block]
+            step >>= 1
+        return block, index
+
+    def find(self, position):
+        block = bisect_left(self.maxes, position)
+        if block == len(self.maxes):
+            block -= 1
+        return block, bisect_left(self.keys[block], position)
+
+    def index(self, task):
+        if self.length > 0:
+            block, offset = self.find(task.position)
+            if offset < len(self.blocks[block]) and \
+                    self.blocks[block][offset] is task:
+                return self.count_before(block) + offset
+        raise ValueError("task is not in the sequence")
+
+    def insert(self, task):
+        position = task.position
+        if self.length == 0:
+            self.blocks = [[task]]
+            self.length = 1
+            self.update_keys()
+            return
+        block, offset = self.find(position)
+        keys = self.keys[block]
+        if offset < len(keys) and keys[offset] == position:
+            raise ValueError("position already taken")
+        keys.insert(offset, position)
+        self.blocks[block].insert(offset, task)
+        self.maxes[block] = keys[-1]
+        self.length += 1
+        if len(keys) > 2 * LOAD:
+            self.blocks.insert(block + 1, self.blocks[block][LOAD:])
+            del self.blocks[block][LOAD:]
+            self.keys.insert(block + 1, keys[LOAD:])
+            del keys[LOAD:]
+            self.maxes.insert(block, keys[-1])
+            self.tree = None
+        else:
+            self.update_tree(block, 1)
+
+    def remove(self, task):
+        block, offset = self.find(task.position)
+        tasks = self.blocks[block]
+        if offset >= len(tasks) or tasks[offset] is not task:
+            raise ValueError("task is not in the sequence")
+        del tasks[offset]
+        del self.keys[block][offset]
+        self.length -= 1
+        if len(tasks) == 0:
+            del self.blocks[block]
+            del self.keys[block]
+            del self.maxes[block]
+            self.tree = None
+        else:
+            self.maxes[block] = self.keys[block][-1]
+            self.update_tree(block, -1)
+
+    def position_for(self, index):
+        """Position for a task inserted at index, None if there is no free
+        position between its neighbours."""
+        before = self[index - 1].position if index > 0 else None
+        after = self[index].position if index < self.length else None
+        if before is None and after is None:
+            return 0
+        if before is None:
+            return after - GAP
+        if after is None:
+            return before + GAP
+        if after - before < 2:
+            return None
+        return (before + after) // 2
+
+    def relabel(self):
+        for i, task in enumerate(self):
+            task.position = i * GAP
+        self.update_keys()
@@ -0,0 +1,68 @@
+# ids.py
+#
+# Copyright (C) 2018 Pawel Jakubowski
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE X CONSORTIUM BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# Except as contained in this notice, the name(s) of the above copyright
+# holders shall not be used in advertising or otherwise to promote the sale,
+# use or other dealings in this Software without prior written
+# authorization.
+
+import os
+import time
+
+# Crockford's base32, ids sort in the order they were created
+ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+# Characters of an id
+ID_LENGTH = 26
+# Two characters for every 10 bits, the top pair holds 8 bits of the id
+PAIRS = [a + b for a in ALPHABET for b in ALPHABET]
+PAIR_SHIFTS = tuple(range(120, -1, -10))
+# To the digits of int(text, 32), other characters become "!", which int()
+# rejects
+TO_DIGITS = bytes(
+    b"0123456789abcdefghijklmnopqrstuv"[ALPHABET.find(chr(c))]
+    if chr(c) in ALPHABET else ord("!") for c in range(256))
+
+
+def new_id():
+    """Return a new ULID - 48 bit timestamp in milliseconds followed by
+    80 random bits. Ids are ints in memory, see encode_id."""
+    return (time.time_ns() // 1000000) << 80 | \
+        int.from_bytes(os.urandom(10), "big")
+
+
+def encode_id(value):
+    """Text of an id, ID_LENGTH characters of ALPHABET."""
+    return "".join([PAIRS[value >> shift & 1023] for shift in PAIR_SHIFTS])
+
+
+def decode_id(text):
+    """Id of an encode_id text, None for None. Raises ValueError if text
+    is not an id."""
+    if text is None:
+        return None
+    if len(text) != ID_LENGTH or not text.isascii():
+        raise ValueError("Invalid id " + repr(text))
+    value = int(text.encode("ascii").translate(TO_DIGITS), 32)
+    if value >> 128:
+        raise ValueError("Invalid id " + repr(text))
+    return value
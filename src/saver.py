@@ -0,0 +1,116 @@
+# saver.py
+#
+# Copyright (C) 2018 Pawel Jakubowski
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE X CONSORTIUM BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# Except as contained in this notice, the name(s) of the above copyright
+# holders shall not be used in advertising or otherwise to promote the sale,
+# use or other dealings in this Software without prior written
+# authorization.
+
+import logging
+import queue
+import threading
+from gi.repository import GLib
+
+# Longest wait before saving again after failed writes, in milliseconds
+MAX_RETRY_DELAY = 60000
+
+
+class SaveScheduler:
+    """Coalesce bursts of board modifications into a single save.
+
+    Every schedule() call restarts a short quiet period. When it expires
+    dirty boards are snapshotted on the main thread and written to disk
+    by a worker thread, so the UI never waits for disk I/O.
+
+    Boards are marked clean when they are snapshotted. If the worker
+    fails to write them, they are marked dirty again on the main thread
+    and saved in full later, waiting longer after each failure.
+    """
+
+    def __init__(self, settings, delay=500):
+        self.settings = settings
+        self.delay = delay
+        self.timeout_id = 0
+        self.queue = queue.Queue()
+        # Snapshots the worker could not write
+        self.failed = queue.Queue()
+        self.failures = 0
+        self.worker = threading.Thread(target=self.run, daemon=True)
+        self.worker.start()
+
+    def schedule(self, delay=None):
+        if self.timeout_id:
+            GLib.source_remove(self.timeout_id)
+        if delay is None:
+            delay = self.delay
+        self.timeout_id = GLib.timeout_add(delay, self.on_timeout)
+
+    def on_timeout(self):
+        self.timeout_id = 0
+        self.submit()
+        return GLib.SOURCE_REMOVE
+
+    def submit(self):
+        snapshots = self.settings.take_snapshots()
+        if len(snapshots) > 0:
+            self.queue.put(snapshots)
+
+    def flush(self):
+        if self.timeout_id:
+            GLib.source_remove(self.timeout_id)
+            self.timeout_id = 0
+        self.submit()
+        self.queue.join()
+        if self.restore():
+            # Last try before the window closes
+            self.submit()
+            self.queue.join()
+
+    def restore(self):
+        """Mark the boards of failed writes dirty again, returns whether
+        there were any."""
+        restored = False
+        while not self.failed.empty():
+            self.settings.mark_unsaved(self.failed.get())
+            restored = True
+        return restored
+
+    def on_write_failed(self):
+        if self.restore():
+            self.failures += 1
+            self.schedule(min(self.delay * 2 ** self.failures,
+                              MAX_RETRY_DELAY))
+        return GLib.SOURCE_REMOVE
+
+    def run(self):
+        while True:
+            snapshots = self.queue.get()
+            try:
+                self.settings.write_snapshots(snapshots)
+                self.failures = 0
+            except Exception:
+                logging.exception("Saving boards failed")
+                self.failed.put(snapshots)
+                GLib.idle_add(self.on_write_failed)
+            finally:
+                self.queue.task_done()
@@ -30,39 +30,222 @@ import os
 import sys
 import json
 import pickle
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from collections.abc import MutableMapping
 
+from . import journal
+from . import binary_board
 from .Board import Board
 from .TaskList import TaskList
 from .Task import Task, DueDate
+from .DueIndex import today_ordinal
+from .ids import decode_id
+
+
+BOARD_VERSION = 4
+TASK_KEYS = {"id", "title", "creation_date", "update_date", "due_date", "position"}
 
 
 class KanbanSettings:
 
-    def __init__(self, config_dir):
-        self.boards = dict()
+    manifest_name = "boards.manifest"
+    # Decoding fewer boards than this is faster than starting a process pool
+    parallel_load_threshold = 8
+    # Size of the load process pool, None uses every cpu
+    load_workers = None
+
+    def __init__(self, config_dir, parallel_load=True):
+        self.boards = BoardCollection()
         self.config_dir = config_dir
+        self.parallel_load = parallel_load
+        # Title, size and task counts of every board file, lets load() skip
+        # decoding boards until they are opened
+        self.manifest = dict()
+        # Number of bytes written by the latest save()
+        self.saved_bytes = 0
+        self.write_lock = threading.Lock()
+        # Number of records in each board journal, used by the worker
+        # thread to decide when to compact
+        self.journal_lengths = dict()
+        # Extension of every board file that is not json
+        self.extensions = dict()
+        # Title, task counts and earliest due date of every board, taken on
+        # the main thread for the manifest, see board_summary()
+        self.summaries = dict()
 
     def add_board(self, board):
         self.boards[board.title] = board
 
+    def agenda(self, days, today=None):
+        """Overdue tasks and tasks due in the next days days on all boards,
+        as (board, task) pairs ordered by due date."""
+        if today is None:
+            today = today_ordinal()
+        agenda = []
+        for title in self.boards:
+            if title not in self.boards.loaded:
+                # Boards without tasks due in time stay undecoded
+                first = self.first_due(title)
+                if first is None or first > today + days:
+                    continue
+            board = self.boards[title]
+            for task_id in board.due().between(0, today + days):
+                task = board.find(task_id)
+                agenda.append((task.due_date.ordinal, board, task))
+        agenda.sort(key=lambda item: item[0])
+        return [(board, task) for ordinal, board, task in agenda]
+
+    def first_due(self, title):
+        """Ordinal of the earliest due date on a board which is not loaded
+        yet, None when it has no due dates."""
+        for entry in self.manifest.values():
+            if entry["title"] == title:
+                return entry["due"]
+        return None
+
     def save(self):
-        if not os.path.exists(self.config_dir):
-            os.makedirs(self.config_dir)
-        for key, b in self.boards.items():
-            config_path = self.config_dir + key + ".json"
-            print("save to", config_path)
-            with open(config_path, "w") as f:
-                json.dump(b, f, cls=BoardEncoder)
+        snapshots = self.take_snapshots()
+        try:
+            return self.write_snapshots(snapshots)
+        except Exception:
+            self.mark_unsaved(snapshots)
+            raise
+
+    def mark_unsaved(self, snapshots):
+        """Make the boards of snapshots that could not be written dirty
+        again, so the next save writes them in full. Must run on the main
+        thread, like take_snapshots()."""
+        for kind, path, board, data in snapshots:
+            board.mark_dirty()
+
+    def take_snapshots(self):
+        """Collect changes of every dirty board and mark it clean.
+
+        Boards which were only slightly modified produce a list of journal
+        records, other boards are copied into plain containers. The result
+        can be handed over to write_snapshots() on another thread while the
+        model keeps changing.
+        """
+        snapshots = []
+        for key, b in self.boards.loaded_items():
+            if not b.is_dirty():
+                continue
+            path = self.config_dir + key
+            # Large batches of changes are cheaper to save as a snapshot
+            if b.needs_snapshot() or not self.has_snapshot(key) or \
+                    b.journal_length() >= journal.COMPACT_THRESHOLD:
+                snapshots.append(("snapshot", path, b, encode_board(b)))
+            else:
+                records = []
+                for op in b.take_journal():
+                    b.journal_seq += 1
+                    records.append([b.journal_seq] + [snapshot(a) for a in op])
+                snapshots.append(("journal", path, b, records))
+            self.summaries[path] = board_summary(b)
+            b.mark_clean()
+        return snapshots
+
+    def board_file(self, path):
+        return path + self.extensions.get(path, ".json")
+
+    def has_snapshot(self, key):
+        return os.path.exists(self.board_file(self.config_dir + key))
+
+    def write_snapshots(self, snapshots):
+        with self.write_lock:
+            if not os.path.exists(self.config_dir):
+                os.makedirs(self.config_dir)
+            saved_bytes = 0
+            for kind, path, board, data in snapshots:
+                if kind == "snapshot":
+                    saved_bytes += self.write_board(path, data)
+                else:
+                    saved_bytes += self.write_journal(path, data)
+                self.update_manifest(path)
+            if len(snapshots) > 0:
+                saved_bytes += self.write_manifest()
+            print("saved", saved_bytes, "bytes")
+            self.saved_bytes = saved_bytes
+            return saved_bytes
+
+    def write_board(self, path, data):
+        filename = self.board_file(path)
+        print("save to", filename)
+        size = write_atomic(filename, binary_board.dumps_any(filename, data))
+        # The snapshot contains everything that was journaled so far
+        if os.path.exists(path + ".journal"):
+            os.remove(path + ".journal")
+        self.journal_lengths[path] = 0
+        return size
+
+    def write_journal(self, path, records):
+        print("append", len(records), "records to", path + ".journal")
+        size = journal.append(path + ".journal", records)
+        length = self.journal_lengths.get(path, 0) + len(records)
+        self.journal_lengths[path] = length
+        if length >= journal.COMPACT_THRESHOLD:
+            size += self.compact(path)
+        return size
+
+    def compact(self, path):
+        print("compact", path + ".journal")
+        data = binary_board.read_any(self.board_file(path))
+        records = journal.read(path + ".journal", data.get("journal_seq", 0))
+        return self.write_board(path, journal.replay(data, records))
+
+    def update_manifest(self, path):
+        # Runs on the worker thread, the board itself may be changing
+        filename = self.board_file(path)
+        size, mtime = file_state(filename)
+        entry = dict(self.summaries[path])
+        entry.update(size=size, mtime=mtime,
+                     journal=file_state(path + ".journal"))
+        self.manifest[os.path.basename(filename)] = entry
+
+    def write_manifest(self):
+        return write_atomic(self.config_dir + self.manifest_name,
+                            json.dumps(self.manifest).encode("utf-8"))
+
+    def read_manifest(self):
+        try:
+            with open(self.config_dir + self.manifest_name, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return dict()
+
+    def is_current(self, entry, filename):
+        path = os.path.splitext(filename)[0]
+        # Manifests of older versions lack the due dates
+        return [entry["size"], entry["mtime"]] == file_state(filename) \
+            and entry["journal"] == file_state(path + ".journal") \
+            and "due" in entry
 
     def load(self):
         if not os.path.exists(self.config_dir) or len(os.listdir(self.config_dir)) == 0:
             self.set_default()
             return
+        manifest = self.read_manifest()
+        stale = []
         for filename in os.listdir(self.config_dir):
             config_path = self.config_dir + filename
             filepath, file_extension = os.path.splitext(config_path)
-            if file_extension == ".json":
-                self.load_json(config_path)
+            if file_extension == binary_board.EXTENSION and \
+                    os.path.exists(filepath + ".json"):
+                print("json configuration for the same board is present -",
+                      config_path, "ignored.")
+            elif file_extension in (".json", binary_board.EXTENSION):
+                if file_extension != ".json":
+                    self.extensions[filepath] = file_extension
+                entry = manifest.get(filename)
+                if entry is not None and self.is_current(entry, config_path):
+                    # Decoded only when the board is opened
+                    self.manifest[filename] = entry
+                    self.boards.add_lazy(
+                        entry["title"], lambda p=config_path: self.load_file(p))
+                else:
+                    stale.append(config_path)
             elif file_extension == ".pkl":
                 # Old configuration
                 json_equivalent = filepath + ".json"
@@ -75,14 +258,50 @@ class KanbanSettings:
                     self.save()
                     if not os.path.exists(json_equivalent):
                         raise RuntimeError("Converting error " + config_path)
+        if self.parallel_load and self.count_load_workers(stale) > 1 and \
+                len(stale) >= self.parallel_load_threshold:
+            self.load_files_parallel(stale)
+        else:
+            for config_path in stale:
+                self.load_file(config_path)
+        if len(stale) > 0 or len(manifest) != len(self.manifest):
+            self.write_manifest()
 
-    def load_json(self, filepath):
+    def load_file(self, filepath):
         print("load from", filepath)
-        with open(filepath, "r") as f:
-            board = json.JSONDecoder(
-                object_hook=decodeBoard).decode(f.read())
-            print("load", board.title, "from", filepath)
-            self.add_board(board)
+        data, journal_length = read_board_data(filepath)
+        return self.add_loaded_board(filepath, data, journal_length)
+
+    def count_load_workers(self, filepaths):
+        return min(len(filepaths), self.load_workers or os.cpu_count() or 1)
+
+    def load_files_parallel(self, filepaths):
+        print("load", len(filepaths), "boards in parallel")
+        with ProcessPoolExecutor(
+                max_workers=self.count_load_workers(filepaths),
+                mp_context=load_context()) as executor:
+            # Workers send back plain containers, unpickling them costs less
+            # than decoding the binary format again. Boards are decoded here
+            # as results arrive, while the workers read the remaining files.
+            loaded = executor.map(read_board_data, filepaths)
+            for filepath, (data, journal_length) in zip(filepaths, loaded):
+                self.add_loaded_board(filepath, data, journal_length)
+
+    def add_loaded_board(self, filepath, data, journal_length):
+        path = os.path.splitext(filepath)[0]
+        if journal_length > 0:
+            print("replayed", journal_length, "journal records")
+            self.journal_lengths[path] = journal_length
+        board = decode_board(data)
+        print("load", board.title, "from", filepath)
+        board.mark_clean()
+        if data.get("version", 1) < BOARD_VERSION:
+            # Journal records need the current format of the snapshot
+            board.mark_dirty()
+        self.add_board(board)
+        self.summaries[path] = board_summary(board)
+        self.update_manifest(path)
+        return board
 
     def load_pkl(self, filepath):
         # Trick pickle to think that there is 'model' module
@@ -96,7 +315,8 @@ class KanbanSettings:
             newboard.add(board.tasklists["Ready"])
             newboard.add(board.tasklists["Doing"])
             newboard.add(board.tasklists["Done"])
-            self.add_board(newboard)
+            # Rebuild the lists and tasks from the classes of this package
+            self.add_board(decode_board(encode_board(newboard)))
 
     def set_default(self):
         b = Board("Work")
@@ -109,25 +329,155 @@ class KanbanSettings:
         self.add_board(b)
 
 
+def board_summary(board):
+    return {
+        "title": board.title,
+        "lists": len(board.tasklists),
+        "tasks": sum(len(l.tasks) for l in board.tasklists),
+        "due": earliest_due(board)
+    }
+
+
+def earliest_due(board):
+    if board.due_index is not None:
+        return board.due_index.first()
+    return min((t.due_date.ordinal for l in board.tasklists for t in l.tasks
+                if t.due_date is not None), default=None)
+
+
+def read_board_data(filepath):
+    # Board file with its journal replayed, as plain containers
+    path = os.path.splitext(filepath)[0]
+    data = binary_board.read_any(filepath)
+    records = []
+    if os.path.exists(path + ".journal"):
+        records = journal.read(path + ".journal", data.get("journal_seq", 0))
+        journal.replay(data, records)
+    return data, len(records)
+
+
+def load_context():
+    # GLib and the save worker have started threads by the time boards are
+    # loaded, a forked child may inherit a lock held by one of them
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context("spawn")
+
+
+class BoardCollection(MutableMapping):
+    """Boards by title, decoded on first access."""
+
+    def __init__(self):
+        self.loaded = dict()
+        self.loaders = dict()
+
+    def __getitem__(self, title):
+        if title not in self.loaded:
+            self[title] = self.loaders[title]()
+        return self.loaded[title]
+
+    def __setitem__(self, title, board):
+        self.loaders.pop(title, None)
+        self.loaded[title] = board
+
+    def __delitem__(self, title):
+        if title in self.loaders:
+            del self.loaders[title]
+        else:
+            del self.loaded[title]
+
+    def __contains__(self, title):
+        return title in self.loaded or title in self.loaders
+
+    def __iter__(self):
+        yield from list(self.loaded)
+        yield from list(self.loaders)
+
+    def __len__(self):
+        return len(self.loaded) + len(self.loaders)
+
+    def add_lazy(self, title, loader):
+        if title not in self.loaded:
+            self.loaders[title] = loader
+
+    def loaded_items(self):
+        return list(self.loaded.items())
+
+
+def file_state(path):
+    # Cheap check whether a file changed since the manifest was written
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def write_atomic(path, data):
+    # Readers never see a partially written file - the old one stays in
+    # place until the new content is safely on disk
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return len(data)
+
+
+def snapshot(o):
+    if isinstance(o, list):
+        return [snapshot(v) for v in o]
+    # Not isinstance(), boards converted from pickles are made of a copy of
+    # the model modules. Every object has __getstate__ since Python 3.11.
+    if hasattr(o, "__slots__"):
+        return {k: snapshot(v) for k, v in o.__getstate__().items()}
+    return o
+
+
 class BoardEncoder(json.JSONEncoder):
 
     def default(self, b):
-        return b.__dict__
-
-
-def decodeBoard(d):
-    o = None
-    if 'day' in d:
-        o = DueDate(0, 0, 0)
-    elif not 'title' in d:
-        return o
-
-    if 'creation_date' in d:
-        o = Task(d['title'])
-    if 'tasks' in d:
-        o = TaskList(d['title'])
-    if 'tasklists' in d:
-        o = Board(d['title'])
-    for p in d:
-        setattr(o, p, d[p])
-    return o
+        return b.__getstate__()
+
+
+def encode_board(board):
+    data = snapshot(board)
+    data["version"] = BOARD_VERSION
+    return data
+
+
+def decode_board(d):
+    """Build a Board from its parsed json representation.
+
+    Version 1 files were written before the version key existed and some
+    of them lack update or due dates of tasks. Tasks in files older than
+    version 3 have no positions, lists and tasks older than version 4 have
+    no ids and get new ones.
+    """
+    version = d.get("version", 1)
+    if version > BOARD_VERSION:
+        raise RuntimeError("Unsupported board version " + str(version))
+    board = Board(d["title"])
+    board.journal_seq = d.get("journal_seq", 0)
+    for l in d["tasklists"]:
+        tasklist = TaskList(l["title"], decode_id(l.get("id")))
+        tasklist.set_tasks([decode_task(t) for t in l["tasks"]])
+        board.add(tasklist)
+    return board
+
+
+def decode_task(d):
+    task = Task(d["title"], d["creation_date"], decode_id(d.get("id")))
+    task.update_date = d.get("update_date", task.creation_date)
+    task.position = d.get("position")
+    due_date = d.get("due_date")
+    if due_date is not None:
+        task.due_date = DueDate(
+            due_date["year"], due_date["month"], due_date["day"])
+    # Attributes added by importers, files of older versions may lack
+    # some of the standard keys
+    if not d.keys() <= TASK_KEYS:
+        for k in d.keys() - TASK_KEYS:
+            task.set_attribute(k, d[k])
+    return task
@@ -0,0 +1,283 @@
+# sqlite_settings.py
+#
+# Copyright (C) 2018 Pawel Jakubowski
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE X CONSORTIUM BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# Except as contained in this notice, the name(s) of the above copyright
+# holders shall not be used in advertising or otherwise to promote the sale,
+# use or other dealings in this Software without prior written
+# authorization.
+
+import os
+import json
+import sqlite3
+
+from .Board import Board
+from .TaskList import TaskList
+from .Task import Task, DueDate
+from .settings import KanbanSettings
+from .ids import decode_id
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS boards (
+    id INTEGER PRIMARY KEY,
+    title TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS tasklists (
+    id INTEGER PRIMARY KEY,
+    board_id INTEGER NOT NULL REFERENCES boards(id),
+    position INTEGER NOT NULL,
+    uid TEXT,
+    title TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    list_id INTEGER NOT NULL REFERENCES tasklists(id),
+    position INTEGER NOT NULL,
+    uid TEXT,
+    title TEXT NOT NULL,
+    creation_date REAL NOT NULL,
+    update_date REAL NOT NULL,
+    due_date TEXT,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS tasklists_board ON tasklists(board_id, position);
+CREATE INDEX IF NOT EXISTS tasks_list ON tasks(list_id, position);
+CREATE INDEX IF NOT EXISTS tasks_due_date ON tasks(due_date);
+"""
+
+# Databases created before lists and tasks had ids lack the uid columns
+UPGRADE = """
+ALTER TABLE tasklists ADD COLUMN uid TEXT;
+ALTER TABLE tasks ADD COLUMN uid TEXT;
+"""
+
+TASK_COLUMNS = ("position", "id", "title", "creation_date", "update_date",
+                "due_date")
+
+
+class SqliteSettings(KanbanSettings):
+    """Boards stored as rows of a single SQLite database.
+
+    Journal records produced by the model become small row updates, so
+    saving a modified task no longer rewrites its board.
+    """
+
+    def __init__(self, config_dir):
+        super().__init__(config_dir)
+        self.db_path = config_dir + "kanban.db"
+        self.db = None
+        self.board_ids = dict()
+        # Number of rows written by the latest save(), saved_bytes stays 0
+        # as SQLite does not tell how many bytes a transaction wrote
+        self.saved_rows = 0
+
+    def connect(self):
+        if not os.path.exists(self.config_dir):
+            os.makedirs(self.config_dir)
+        # The save worker thread shares the connection, guarded by write_lock
+        self.db = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.db.executescript(SCHEMA)
+        columns = [row[1] for row in self.db.execute(
+            "PRAGMA table_info(tasks)")]
+        if "uid" not in columns:
+            self.db.executescript(UPGRADE)
+
+    def load(self):
+        self.connect()
+        with self.write_lock:
+            for board_id, title in self.db.execute(
+                    "SELECT id, title FROM boards ORDER BY id"):
+                self.board_ids[title] = board_id
+        if len(self.board_ids) == 0:
+            self.migrate()
+            return
+        for title, board_id in self.board_ids.items():
+            # Decoded only when the board is opened
+            self.boards.add_lazy(
+                title, lambda i=board_id, t=title: self.load_board(i, t))
+
+    def migrate(self):
+        # One-shot import of json (and legacy pkl) configuration
+        legacy = KanbanSettings(self.config_dir)
+        legacy.load()
+        if len(legacy.boards) == 0:
+            legacy.set_default()
+        print("migrating", len(legacy.boards), "boards to", self.db_path)
+        for board in legacy.boards.values():
+            board.mark_dirty()
+            self.add_board(board)
+        self.save()
+
+    def load_board(self, board_id, title):
+        with self.write_lock:
+            return self.query_board(board_id, title)
+
+    def query_board(self, board_id, title):
+        board = Board(title)
+        lists = dict()
+        tasks = dict()
+        missing_ids = False
+        for list_id, uid, list_title in self.db.execute(
+                "SELECT id, uid, title FROM tasklists WHERE board_id = ? "
+                "ORDER BY position", (board_id,)):
+            lists[list_id] = TaskList(list_title, decode_id(uid))
+            board.add(lists[list_id])
+            tasks[list_id] = []
+            missing_ids = missing_ids or uid is None
+        for row in self.db.execute(
+                "SELECT tasks.list_id, tasks.position, tasks.uid, "
+                "tasks.title, tasks.creation_date, tasks.update_date, "
+                "tasks.due_date, tasks.extra FROM tasks "
+                "JOIN tasklists ON tasks.list_id = tasklists.id "
+                "WHERE tasklists.board_id = ? "
+                "ORDER BY tasks.list_id, tasks.position", (board_id,)):
+            tasks[row[0]].append(decode_task(row[1:]))
+            missing_ids = missing_ids or row[2] is None
+        for list_id, tasklist in lists.items():
+            tasklist.set_tasks(tasks[list_id])
+        print("load", title, "from", self.db_path)
+        board.mark_clean()
+        if missing_ids:
+            # Rows written before ids existed, store the new ones
+            board.mark_dirty()
+        return board
+
+    def first_due(self, title):
+        with self.write_lock:
+            first, = self.db.execute(
+                "SELECT MIN(tasks.due_date) FROM tasks "
+                "JOIN tasklists ON tasks.list_id = tasklists.id "
+                "WHERE tasklists.board_id = ?",
+                (self.board_ids[title],)).fetchone()
+        if first is None:
+            return None
+        year, month, day = first.split("-")
+        return DueDate(int(year), int(month), int(day)).ordinal
+
+    def has_snapshot(self, key):
+        return key in self.board_ids
+
+    def write_snapshots(self, snapshots):
+        with self.write_lock:
+            saved_rows = 0
+            # A failed transaction is rolled back, see mark_unsaved
+            with self.db:
+                for kind, path, board, data in snapshots:
+                    if kind == "snapshot":
+                        saved_rows += self.write_board(data)
+                    else:
+                        saved_rows += self.write_records(board.title, data)
+            print("saved", saved_rows, "rows to", self.db_path)
+            self.saved_rows = saved_rows
+            return saved_rows
+
+    def write_board(self, data):
+        title = data["title"]
+        board_id = self.board_ids.get(title)
+        if board_id is None:
+            board_id = self.db.execute(
+                "INSERT INTO boards (title) VALUES (?)", (title,)).lastrowid
+            self.board_ids[title] = board_id
+        else:
+            self.db.execute(
+                "DELETE FROM tasks WHERE list_id IN "
+                "(SELECT id FROM tasklists WHERE board_id = ?)", (board_id,))
+            self.db.execute(
+                "DELETE FROM tasklists WHERE board_id = ?", (board_id,))
+        rows = 1
+        for position, l in enumerate(data["tasklists"]):
+            list_id = self.db.execute(
+                "INSERT INTO tasklists (board_id, position, uid, title) "
+                "VALUES (?, ?, ?, ?)",
+                (board_id, position, l.get("id"), l["title"])).lastrowid
+            self.db.executemany(
+                "INSERT INTO tasks (list_id, position, uid, title, "
+                "creation_date, update_date, due_date, extra) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                ((list_id,) + encode_task(t) for t in l["tasks"]))
+            rows += 1 + len(l["tasks"])
+        return rows
+
+    def write_records(self, title, records):
+        board_id = self.board_ids[title]
+        for record in records:
+            op, list_position, position = record[1:4]
+            list_id, = self.db.execute(
+                "SELECT id FROM tasklists WHERE board_id = ? AND position = ?",
+                (board_id, list_position)).fetchone()
+            if op == "insert":
+                task = dict(record[4], position=position)
+                self.db.execute(
+                    "INSERT INTO tasks (list_id, position, uid, title, "
+                    "creation_date, update_date, due_date, extra) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (list_id,) + encode_task(task))
+            elif op == "remove":
+                self.db.execute(
+                    "DELETE FROM tasks WHERE list_id = ? AND position = ?",
+                    (list_id, position))
+            elif op == "move":
+                self.db.execute(
+                    "UPDATE tasks SET position = ? "
+                    "WHERE list_id = ? AND position = ?",
+                    (record[4], list_id, position))
+            elif op == "title":
+                self.db.execute(
+                    "UPDATE tasks SET title = ?, update_date = ? "
+                    "WHERE list_id = ? AND position = ?",
+                    (record[4], record[5], list_id, position))
+            elif op == "due":
+                self.db.execute(
+                    "UPDATE tasks SET due_date = ? "
+                    "WHERE list_id = ? AND position = ?",
+                    (encode_due_date(record[4]), list_id, position))
+            else:
+                raise RuntimeError("Unknown journal operation " + str(op))
+        return len(records)
+
+
+def encode_due_date(d):
+    if d is None:
+        return None
+    return "%04d-%02d-%02d" % (d["year"], d["month"], d["day"])
+
+
+def encode_task(t):
+    # Attributes added by importers are kept as json
+    extra = {k: v for k, v in t.items() if k not in TASK_COLUMNS}
+    return (t["position"], t.get("id"), t["title"], t["creation_date"], t["update_date"],
+            encode_due_date(t.get("due_date")),
+            json.dumps(extra) if len(extra) > 0 else None)
+
+
+def decode_task(row):
+    position, uid, title, creation_date, update_date, due_date, extra = row
+    task = Task(title, creation_date, decode_id(uid))
+    task.position = position
+    task.update_date = update_date
+    if due_date is not None:
+        year, month, day = due_date.split("-")
+        task.due_date = DueDate(int(year), int(month), int(day))
+    if extra is not None:
+        for k, v in json.loads(extra).items():
+            task.set_attribute(k, v)
+    return task
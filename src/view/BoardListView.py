@@ -84,6 +84,7 @@ class BoardListView(Gtk.ScrolledWindow):
                 for listname in "Backlog Ready Doing Done".split():
                     b.add(TaskList(listname))
                 self.settings.add_board(b)
+                self.window.saver.schedule()
                 self.refresh()
         dialog.destroy()
 
@@ -26,9 +26,18 @@
 # use or other dealings in this Software without prior written
 # authorization.
 
-from gi.repository import Gtk, GObject
+from gi.repository import Gtk, GObject, GLib, Pango
 from .gi_composites import GtkTemplate
 from .KanbanListView import KanbanListView
+from .Selection import Selection
+
+# Time the rows of the board may be populated for between two frames,
+# in microseconds
+POPULATE_BUDGET = 8000
+# Rows added to a list at once while populating
+POPULATE_STEP = 10
+# Tasks added to the search index at once, after the rows
+INDEX_STEP = 100
 
 
 @GtkTemplate(ui='/org/gnome/kanban/ui/board.ui')
@@ -42,17 +51,25 @@ class BoardView(Gtk.Box):
         "signal-task-move-bottom": (GObject.SIGNAL_ACTION, None, ()),
         "signal-task-move-left-top": (GObject.SIGNAL_ACTION, None, ()),
         "signal-task-move-right-top": (GObject.SIGNAL_ACTION, None, ()),
-        "signal-exit": (GObject.SIGNAL_ACTION, None, ()),
-        "task-move-up": (GObject.SIGNAL_RUN_FIRST, None, (str,)),
-        "task-move-down": (GObject.SIGNAL_RUN_FIRST, None, (str,)),
-        "task-move-top": (GObject.SIGNAL_RUN_FIRST, None, (str,)),
-        "task-move-bottom": (GObject.SIGNAL_RUN_FIRST, None, (str,)),
-        "task-move-left-top": (GObject.SIGNAL_RUN_FIRST, None, (str,)),
-        "task-move-right-top": (GObject.SIGNAL_RUN_FIRST, None, (str,))
+        "signal-exit": (GObject.SIGNAL_ACTION, None, ())
+    }
+
+    # Keyboard moves run the TaskListView method of the focused list only
+    task_commands = {
+        "signal-task-move-up": "move_up",
+        "signal-task-move-down": "move_down",
+        "signal-task-move-top": "move_top",
+        "signal-task-move-bottom": "move_bottom",
+        "signal-task-move-left-top": "move_to_prev_list",
+        "signal-task-move-right-top": "move_to_next_list"
     }
 
     headerbar, \
-        returnbutton = GtkTemplate.Child().widgets(2)
+        returnbutton, \
+        searchentry = GtkTemplate.Child().widgets(3)
+
+    # Number of tasks shown below the search entry
+    search_results_count = 20
 
     def __init__(self, board, window):
         super().__init__(
@@ -60,6 +77,9 @@ class BoardView(Gtk.Box):
         self.init_template()
         self.board = board
         self.window = window
+        self.selection = Selection()
+        self.populate_id = 0
+        self.connect("destroy", lambda w: self.stop_populate())
 
         self.window.bind_accelerator(self, "<Alt>Up", "signal-task-move-up")
         self.window.bind_accelerator(
@@ -73,25 +93,35 @@ class BoardView(Gtk.Box):
         self.window.bind_accelerator(
             self, "<Alt>Right", "signal-task-move-right-top")
         self.add_noneditable_accelerators()
-        self.connect("signal-task-move-up",
-                     lambda w: self.emit("task-move-up", self.get_focus_list_name()))
-        self.connect("signal-task-move-down",
-                     lambda w: self.emit("task-move-down", self.get_focus_list_name()))
-        self.connect("signal-task-move-top",
-                     lambda w: self.emit("task-move-top", self.get_focus_list_name()))
-        self.connect("signal-task-move-bottom",
-                     lambda w: self.emit("task-move-bottom", self.get_focus_list_name()))
-        self.connect("signal-task-move-left-top",
-                     lambda w: self.emit("task-move-left-top", self.get_focus_list_name()))
-        self.connect("signal-task-move-right-top",
-                     lambda w: self.emit("task-move-right-top", self.get_focus_list_name()))
+        for signal, command in self.task_commands.items():
+            self.connect(signal, self.on_task_command, command)
         self.connect("signal-exit", self.on_back_clicked)
 
         self.headerbar.props.title = self.window.appname + " \u2013 " + self.board.title
         self.window.set_titlebar(self.headerbar)
         self.returnbutton.connect("clicked", self.on_back_clicked)
+        # Changes of the board made anywhere show up without a refresh
+        self.board.subscribe(self.on_board_changes)
+        self.connect("destroy", lambda w:
+                     self.board.unsubscribe(self.on_board_changes))
+        self.window.clock.subscribe(self.on_day_changed)
+        self.connect("destroy", lambda w:
+                     self.window.clock.unsubscribe(self.on_day_changed))
+        self.search_results = Gtk.ListBox()
+        self.search_results.connect("row-activated", self.on_search_result)
+        self.search_popover = Gtk.Popover.new(self.searchentry)
+        self.search_popover.set_modal(False)
+        self.search_popover.add(self.search_results)
+        self.searchentry.connect("search-changed", self.on_search_changed)
+        self.searchentry.connect("activate", self.on_search_activate)
+        self.searchentry.connect("focus-in-event", lambda w, e:
+                                 self.remove_noneditable_accelerators())
+        self.searchentry.connect("focus-out-event", lambda w, e:
+                                 self.add_noneditable_accelerators())
 
         self.refresh()
+        # Also builds the search index, see on_populate
+        self.populate()
 
     def add_noneditable_accelerators(self):
         self.window.bind_accelerator(self, "Escape", "signal-exit")
@@ -99,23 +129,144 @@ class BoardView(Gtk.Box):
     def remove_noneditable_accelerators(self):
         self.window.remove_accelerator(self, "Escape")
 
-    def get_focus_list_name(self):
-        return self.get_focus_child().get_tasklist().get_title()
+    def on_task_command(self, widget, command):
+        list_view = self.get_focus_child()
+        if list_view is None:
+            return
+        getattr(list_view.get_tasklist(), command)()
 
-    def add_tasklist_view(self, tasklist):
+    def add_tasklist_view(self, tasklist, index):
         l = KanbanListView(tasklist, self)
-        l.get_tasklist().connect("modified", lambda w: self.window.user_settings.save())
-        self.lists.append(l)
+        self.lists.insert(index, l)
         self.pack_start(l, True, True, 0)
+        self.reorder_child(l, index)
+        self.populate()
+        return l
+
+    def populate(self):
+        """Add the missing rows of the lists and index the tasks for search
+        in idle time, between frames."""
+        if self.populate_id == 0:
+            self.populate_id = GLib.idle_add(self.on_populate)
+
+    def stop_populate(self):
+        if self.populate_id != 0:
+            GLib.source_remove(self.populate_id)
+            self.populate_id = 0
+
+    def on_populate(self):
+        deadline = GLib.get_monotonic_time() + POPULATE_BUDGET
+        # Rows in view of every list come first
+        for visible_only in (True, False):
+            for l in self.lists:
+                list_view = l.get_tasklist()
+                while list_view.populate(POPULATE_STEP, visible_only):
+                    if GLib.get_monotonic_time() > deadline:
+                        return GLib.SOURCE_CONTINUE
+        # The first search would build the whole index at once
+        while self.board.index_tasks(INDEX_STEP):
+            if GLib.get_monotonic_time() > deadline:
+                return GLib.SOURCE_CONTINUE
+        self.populate_id = 0
+        return GLib.SOURCE_REMOVE
+
+    def on_board_changes(self, changes):
+        # A batch of changes is saved at once
+        self.window.saver.schedule()
+        # Changes arrive after the whole batch ran, the view of a list
+        # added in it already shows the tasks the list has now
+        added = set()
+        for change in changes:
+            if change.kind == "list-insert":
+                added.add(change.tasklist)
+            elif change.kind == "list-remove":
+                added.discard(change.tasklist)
+            elif change.tasklist in added and \
+                    not change.kind.startswith("list-"):
+                continue
+            self.on_board_change(change)
+
+    def on_board_change(self, change):
+        if change.kind == "list-insert":
+            self.add_tasklist_view(change.tasklist, change.index).show_all()
+        elif change.kind == "list-remove":
+            self.lists.pop(change.index).destroy()
+        elif change.kind == "list-move":
+            l = self.lists.pop(change.index)
+            self.lists.insert(change.new_index, l)
+            self.reorder_child(l, change.new_index)
+        elif change.kind == "list-update":
+            self.find_list(change.tasklist).refresh_title()
+        else:
+            self.find_list(change.tasklist).get_tasklist() \
+                .on_model_change(change)
 
     def get_list(self, index):
         return self.lists[index]
 
-    def get_list_index(self, name):
-        for i, l in enumerate(self.lists):
-            if l.get_tasklist().get_title() == name:
-                return i
-        return None
+    def find_list(self, tasklist):
+        # The board may have moved or removed the list later in a batch
+        for l in self.lists:
+            if l.get_tasklist().tasklist is tasklist:
+                return l
+
+    def get_list_index(self, list_id):
+        # Views are kept in the order of the board's task lists
+        return self.board.tasklist_index(list_id)
+
+    def get_task_row(self, task_id):
+        """TaskView showing the task with the given id, None if there is
+        no such task on the board."""
+        tasklist = self.board.find_tasklist(task_id)
+        if tasklist is None:
+            return None
+        list_view = self.get_list(self.get_list_index(tasklist.id))
+        index = tasklist.tasks.index(self.board.find(task_id))
+        return list_view.get_tasklist().show_task(index)
+
+    def on_day_changed(self, previous, today):
+        # Only rows whose priority class changes are drawn again
+        for task_id in self.board.due().priority_changed(previous, today):
+            tasklist = self.board.find_tasklist(task_id)
+            list_view = self.get_list(self.get_list_index(tasklist.id))
+            index = tasklist.tasks.index(self.board.find(task_id))
+            task_view = list_view.get_tasklist().get_task_view(index)
+            if task_view is not None:
+                task_view.refresh()
+
+    def show_task(self, task_id):
+        row = self.get_task_row(task_id)
+        if row is None:
+            return
+        row.get_parent().select_only(row)
+        row.grab_focus()
+
+    def on_search_changed(self, entry):
+        for row in self.search_results.get_children():
+            row.destroy()
+        for task_id in self.board.search(entry.get_text(),
+                                         self.search_results_count):
+            row = Gtk.ListBoxRow()
+            row.task_id = task_id
+            label = Gtk.Label(label=self.board.find(task_id).title, xalign=0)
+            label.set_ellipsize(Pango.EllipsizeMode.END)
+            label.set_max_width_chars(40)
+            row.add(label)
+            self.search_results.add(row)
+        if len(self.search_results.get_children()) > 0:
+            self.search_results.show_all()
+            self.search_popover.popup()
+        else:
+            self.search_popover.popdown()
+
+    def on_search_activate(self, entry):
+        row = self.search_results.get_row_at_index(0)
+        if row is not None:
+            self.on_search_result(self.search_results, row)
+
+    def on_search_result(self, listbox, row):
+        self.search_popover.popdown()
+        self.show_task(row.task_id)
 
     def on_back_clicked(self, button):
         self.window.draw_boards_list()
@@ -123,17 +274,42 @@ class BoardView(Gtk.Box):
     def get_title(self):
         return self.board.title
 
+    def count_rows(self):
+        return sum(l.get_tasklist().last - l.get_tasklist().first
+                   for l in self.lists)
+
     def clear(self):
         for child in self.get_children():
             child.destroy()
         self.lists = []
 
+    def reconcile(self):
+        """Bring the views up to date with the board without rebuilding
+        them. Views of the lists still on the board are kept and only
+        update their rows, see TaskListView.reconcile."""
+        views = {l.get_tasklist().tasklist: l for l in self.lists}
+        lists = []
+        for index, tasklist in enumerate(self.board.tasklists):
+            l = views.pop(tasklist, None)
+            if l is None:
+                l = KanbanListView(tasklist, self)
+                self.pack_start(l, True, True, 0)
+                l.show_all()
+                self.populate()
+            else:
+                l.refresh_title()
+                l.get_tasklist().reconcile()
+            self.reorder_child(l, index)
+            lists.append(l)
+        for l in views.values():
+            l.destroy()
+        self.lists = lists
+        self.populate()
+
     def refresh(self):
         self.clear()
-        for l in self.board.tasklists:
-            self.add_tasklist_view(l)
+        for i, l in enumerate(self.board.tasklists):
+            self.add_tasklist_view(l, i)
         if len(self.board.tasklists) > 0:
             first_list = self.get_children()[0].get_tasklist()
-            first_elem = first_list.get_row_at_index(0)
-            first_list.select_row(first_elem)
-            first_elem.grab_focus()
+            first_list.select_task(0)
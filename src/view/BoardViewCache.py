@@ -0,0 +1,85 @@
+# BoardViewCache.py
+#
+# Copyright (C) 2018 Pawel Jakubowski
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE X CONSORTIUM BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# Except as contained in this notice, the name(s) of the above copyright
+# holders shall not be used in advertising or otherwise to promote the sale,
+# use or other dealings in this Software without prior written
+# authorization.
+
+from collections import OrderedDict
+
+
+class BoardViewCache:
+    """Board views kept in the window stack after they are hidden.
+
+    Going back to a recently shown board only switches the visible child
+    of the stack. Hidden views keep their rows, and their subscriptions to
+    the board, the clock and the TaskView pool, until there are more than
+    max_views of them or their rows go over the budget. Then the least
+    recently shown views are destroyed and their rows go back to the pool.
+    Views of boards which left the collection are destroyed right away.
+    """
+
+    def __init__(self, stack, budget, max_views, boards):
+        self.stack = stack
+        self.budget = budget
+        self.max_views = max_views
+        self.boards = boards
+        # Board name -> BoardView, least recently shown first
+        self.views = OrderedDict()
+
+    def get(self, name):
+        view = self.views.get(name)
+        if view is not None:
+            self.views.move_to_end(name)
+        return view
+
+    def add(self, name, view):
+        self.views[name] = view
+        self.stack.add(view)
+
+    def remove(self, name):
+        view = self.views.pop(name, None)
+        if view is not None:
+            view.destroy()
+
+    def evict(self):
+        shown = self.stack.get_visible_child()
+        # Boards which are not loaded have no views, leave them undecoded
+        boards = dict(self.boards.loaded_items())
+        for name, view in list(self.views.items()):
+            if view is not shown and boards.get(name) is not view.board:
+                self.remove(name)
+        hidden = [view for view in self.views.values() if view is not shown]
+        rows = sum(view.count_rows() for view in hidden)
+        count = len(hidden)
+        for name, view in list(self.views.items()):
+            if rows <= self.budget and count <= self.max_views:
+                break
+            if view is not shown:
+                rows -= view.count_rows()
+                count -= 1
+                self.remove(name)
+
+    def __len__(self):
+        return len(self.views)
@@ -36,14 +36,18 @@ class KanbanListView(Gtk.Box):
         super().__init__(
             orientation=Gtk.Orientation.VERTICAL, spacing=6)
         self.title = Gtk.Label()
-        self.title.set_text(tasklist.title)
         self.pack_start(self.title, False, False, 0)
         self.tasklist = TaskListView(tasklist, board)
-        self.tasklist.set_selection_mode(Gtk.SelectionMode.SINGLE)
+        self.tasklist.set_selection_mode(Gtk.SelectionMode.MULTIPLE)
         scrolled = Gtk.ScrolledWindow()
         scrolled.set_policy(Gtk.PolicyType.NEVER, Gtk.PolicyType.AUTOMATIC)
         scrolled.add(self.tasklist)
+        self.tasklist.set_scroll_adjustment(scrolled.get_vadjustment())
         self.pack_start(scrolled, True, True, 0)
+        self.refresh_title()
+
+    def refresh_title(self):
+        self.title.set_text(self.tasklist.tasklist.title)
 
     def get_tasklist(self):
         return self.tasklist
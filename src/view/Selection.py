@@ -0,0 +1,55 @@
+# Selection.py
+#
+# Copyright (C) 2018 Pawel Jakubowski
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE X CONSORTIUM BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# Except as contained in this notice, the name(s) of the above copyright
+# holders shall not be used in advertising or otherwise to promote the sale,
+# use or other dealings in this Software without prior written
+# authorization.
+
+
+class Selection:
+    """Selected rows of a board view.
+
+    Rows can be selected in one list at a time. That list is recorded,
+    so a selection in another list only clears the previous list
+    instead of every list of the board.
+    """
+
+    def __init__(self):
+        self.list_view = None
+        # Selected tasks, in list order
+        self.tasks = []
+
+    def update(self, list_view, rows):
+        """Record rows, in list order, as the selected rows of list_view."""
+        if len(rows) == 0:
+            if list_view is self.list_view:
+                self.list_view = None
+                self.tasks = []
+            return
+        previous = self.list_view
+        self.list_view = list_view
+        # The NewTask row has no task
+        self.tasks = [row.task for row in rows if hasattr(row, "task")]
+        if previous is not None and previous is not list_view:
+            previous.unselect_all()
@@ -26,50 +26,68 @@
 # use or other dealings in this Software without prior written
 # authorization.
 
-import cairo
-import pickle
-from gi.repository import Gtk, GObject, Gdk
-from .TaskView import TaskView
+import difflib
+from gi.repository import Gtk
 from .NewTask import NewTask
 from .Task import Task
 
+# Lists with more tasks than this create rows only around the visible part
+WINDOW_THRESHOLD = 200
+# Rows created above and below the visible part of a long list
+WINDOW_MARGIN = 20
+# Height of a row used until one is allocated
+DEFAULT_ROW_HEIGHT = 40
+
+
+class Spacer(Gtk.ListBoxRow):
+    """Empty row standing in for the rows of tasks which are not created."""
+
+    def __init__(self):
+        super().__init__(selectable=False, activatable=False)
+        self.set_can_focus(False)
+        self.set_no_show_all(True)
+
+    def set_height(self, height):
+        self.set_size_request(-1, height)
+        self.set_visible(height > 0)
+
+
 # TODO use GtkTemplate
 class TaskListView(Gtk.ListBox):
+    """Rows of a task list.
 
-    __gsignals__ = {
-        "modified": (GObject.SIGNAL_RUN_FIRST, None, ())
-    }
+    Only rows of tasks from first to last (exclusive) exist, spacer rows
+    above and below them keep the scrollbar right. The rows are:
 
-    handlers = []
+        top spacer, TaskView of tasks first .. last - 1, bottom spacer,
+        NewTask
+    """
 
     def __init__(self, tasklist, board):
         super().__init__()
         self.tasklist = tasklist
-        self.connect("row-selected", self.on_row_selected)
+        self.connect("selected-rows-changed", self.on_selected_rows_changed)
         self.board = board
-        for t in tasklist.tasks:
-            task_view = TaskView(t, board)
-            self.set_drag_and_drop(task_view)
-            index = len(self.get_children())
-            h = []
-            h.append(task_view.connect("delete", self.on_task_delete))
-            h.append(task_view.connect("modified", self.on_task_modified))
-            self.handlers.append(h)
-            self.add(task_view)
+        # Handler ids of the task rows, rows are shared with other lists.
+        # They are disconnected when the rows are released on destroy.
+        self.handlers = []
+        self.adjustment = None
+        self.row_height = DEFAULT_ROW_HEIGHT
+        self.first = 0
+        self.last = 0
+        self.top_spacer = Spacer()
+        self.bottom_spacer = Spacer()
+        self.add(self.top_spacer)
+        self.add(self.bottom_spacer)
         new_task = NewTask()
         new_task.connect("enter", self.on_new_task_enter)
         new_task.connect("closed", self.on_new_task_closed)
         new_task.connect("modified", lambda w, text: self.add_task(Task(text)))
         self.add(new_task)
-        board.connect("task-move-up", lambda w, listname: self.move_up())
-        board.connect("task-move-down", lambda w, listname: self.move_down())
-        board.connect("task-move-top", lambda w, listname: self.move_top())
-        board.connect("task-move-bottom", lambda w,
-                      listname: self.move_bottom())
-        board.connect("task-move-left-top", lambda w,
-                      listname: self.move_to_prev_list(listname))
-        board.connect("task-move-right-top", lambda w,
-                      listname: self.move_to_next_list(listname))
+        # Rows are created later in idle time, see BoardView.populate
+        self.update_spacers()
+        # Task rows go back to the window pool when the list goes away
+        self.connect("destroy", lambda w: self.release_rows())
 
     def get_board(self):
         return self.board
@@ -77,174 +95,352 @@ class TaskListView(Gtk.ListBox):
     def get_title(self):
         return self.tasklist.title
 
-    def on_row_selected(self, task_list, task_view):
-        if task_view is None:
+    def get_id(self):
+        return self.tasklist.id
+
+    def on_selected_rows_changed(self, task_list):
+        rows = sorted(self.get_selected_rows(), key=lambda r: r.get_index())
+        self.board.selection.update(self, rows)
+
+    def get_selected_tasks(self):
+        if self.board.selection.list_view is not self:
+            return []
+        return list(self.board.selection.tasks)
+
+    # Rows of the visible part
+    def set_scroll_adjustment(self, adjustment):
+        self.adjustment = adjustment
+        self.set_adjustment(adjustment)
+        adjustment.connect("value-changed", lambda a: self.update_window())
+        adjustment.connect("changed", lambda a: self.update_window())
+
+    def visible_range(self):
+        if self.last > self.first:
+            height = self.get_row_at_index(1).get_allocated_height()
+            if height > 1:
+                self.row_height = height
+        if self.adjustment is None:
+            return 0, WINDOW_MARGIN
+        value = self.adjustment.get_value()
+        page_size = self.adjustment.get_page_size()
+        if page_size <= 0:
+            # Not allocated yet
+            page_size = WINDOW_MARGIN * self.row_height
+        visible_first = int(value // self.row_height)
+        visible_last = int((value + page_size) // self.row_height) + 1
+        return visible_first, visible_last
+
+    def update_window(self):
+        count = len(self.tasklist.tasks)
+        if count <= WINDOW_THRESHOLD or self.last <= self.first:
+            if self.last - self.first < count:
+                self.board.populate()
             return
-        board = task_list.get_board()
-        for l in board.lists:
-            if l.get_tasklist() is not task_list:
-                l.get_tasklist().unselect_all()
+        visible_first, visible_last = self.visible_range()
+        if visible_first < self.first or \
+                min(visible_last, count) > self.last:
+            self.set_window(visible_first - WINDOW_MARGIN,
+                            visible_last + WINDOW_MARGIN)
 
-    def add_task(self, task):
-        task_view = TaskView(task, self.board)
-        self.set_drag_and_drop(task_view)
-        # insert before NewTask
-        self.insert_task(task_view, len(self.tasklist.tasks))
-        task_view.show_all()
+    def target_window(self, visible_only):
+        """Rows the list should have, only those in view if visible_only."""
+        count = len(self.tasklist.tasks)
+        visible_first, visible_last = self.visible_range()
+        if count <= WINDOW_THRESHOLD:
+            first, last = 0, count
+        else:
+            first = visible_first - WINDOW_MARGIN
+            last = visible_last + WINDOW_MARGIN
+        if visible_only:
+            first = max(first, visible_first)
+            last = min(last, visible_last)
+        first = max(0, min(first, count))
+        return first, max(first, min(last, count))
 
-    def insert_task(self, task_view, index):
+    def populate(self, count, visible_only):
+        """Create up to count rows towards target_window, returns whether
+        rows are still missing."""
+        first, last = self.target_window(visible_only)
+        if self.last > self.first:
+            around_first, around_last = self.target_window(False)
+            if around_last <= self.first or around_first >= self.last:
+                # None of the rows is near the view anymore
+                self.set_window(first, first)
+        if self.last <= self.first:
+            self.set_window(first, min(last, first + count))
+        elif first < self.first or last > self.last:
+            self.set_window(max(first, self.first - count)
+                            if first < self.first else self.first,
+                            min(last, self.last + count)
+                            if last > self.last else self.last)
+        return first < self.first or last > self.last
+
+    def set_window(self, first, last):
+        count = len(self.tasklist.tasks)
+        first = max(0, min(first, count))
+        last = max(first, min(last, count))
+        if last <= self.first or first >= self.last:
+            while self.last > self.first:
+                self.remove_task_view(1)
+                self.last -= 1
+            self.first = self.last = first
+        while self.first < first:
+            self.remove_task_view(1)
+            self.first += 1
+        while self.last > last:
+            self.remove_task_view(self.last - self.first)
+            self.last -= 1
+        while self.first > first:
+            self.first -= 1
+            self.create_task_view(self.tasklist.tasks[self.first], 1)
+        while self.last < last:
+            self.create_task_view(self.tasklist.tasks[self.last],
+                                  self.last - self.first + 1)
+            self.last += 1
+        self.update_spacers()
+
+    def update_spacers(self):
+        self.top_spacer.set_height(self.first * self.row_height)
+        self.bottom_spacer.set_height(
+            (len(self.tasklist.tasks) - self.last) * self.row_height)
+
+    def create_task_view(self, task, row_index):
+        # Rows are created only for tasks between first and last
+        task_view = self.board.window.task_views.acquire(task)
         h = []
         h.append(task_view.connect("delete", self.on_task_delete))
-        h.append(task_view.connect("modified", self.on_task_modified))
-        self.handlers.insert(index, h)
-        self.insert(task_view, index)
-        self.tasklist.insert(index, task_view.task)
-        self.emit("modified")
+        h.append(task_view.connect("dropped", self.on_task_dropped))
+        self.handlers.insert(row_index - 1, h)
+        self.insert(task_view, row_index)
+        task_view.show_all()
+        return task_view
 
-    def remove_task(self, task_view):
-        index = task_view.get_index()
-        self.tasklist.remove(index)
-        for h in self.handlers[index]:
+    def remove_task_view(self, row_index):
+        task_view = self.get_row_at_index(row_index)
+        for h in self.handlers.pop(row_index - 1):
             task_view.disconnect(h)
-        del self.handlers[index]
+        # GTK3 rows keep their selected state when removed, a reused row
+        # would show up selected in another list
+        if task_view.is_selected():
+            self.unselect_row(task_view)
         self.remove(task_view)
-        self.emit("modified")
+        self.board.window.task_views.release(task_view)
 
-    def move_up(self):
-        task = self.get_selected_row()
-        if task is None:
+    def release_rows(self):
+        self.set_window(0, 0)
+
+    def get_task_view(self, index):
+        """TaskView of the task at index, None if it is not created."""
+        if self.first <= index < self.last:
+            return self.get_row_at_index(index - self.first + 1)
+        return None
+
+    def get_task_index(self, task_view):
+        return task_view.get_index() - 1 + self.first
+
+    def show_task(self, index):
+        """Create the row of the task at index if needed and scroll to it."""
+        if self.get_task_view(index) is None and self.adjustment is not None:
+            # Scrolling updates the window
+            self.adjustment.set_value(index * self.row_height)
+        if self.get_task_view(index) is None:
+            if len(self.tasklist.tasks) <= WINDOW_THRESHOLD:
+                # The rest of a short list is still being populated
+                self.set_window(min(self.first, index),
+                                max(self.last, index + 1))
+            else:
+                self.set_window(index - WINDOW_MARGIN,
+                                index + WINDOW_MARGIN)
+        return self.get_task_view(index)
+
+    def reconcile(self):
+        """Bring the rows up to date with the task list.
+
+        Shown rows are matched to tasks by identity, so only rows of added,
+        removed or moved tasks are released or created and only rows of
+        changed tasks are refreshed. Scroll position and selection are kept.
+        """
+        tasks = self.tasklist.tasks
+        count = len(tasks)
+        # Missing rows are added by BoardView.populate
+        first = min(self.first, count)
+        last = min(self.last, count)
+        shown = [self.get_row_at_index(i).task
+                 for i in range(1, self.last - self.first + 1)]
+        wanted = [tasks[i] for i in range(first, last)]
+        selected_tasks = self.get_selected_tasks()
+        matcher = difflib.SequenceMatcher(None, shown, wanted, autojunk=False)
+        # Backwards, so row indices of the parts not done yet stay valid
+        for tag, i1, i2, j1, j2 in reversed(matcher.get_opcodes()):
+            if tag == "equal":
+                for row_index in range(i1 + 1, i2 + 1):
+                    task_view = self.get_row_at_index(row_index)
+                    if task_view.is_stale():
+                        task_view.refresh()
+                continue
+            for row_index in range(i2, i1, -1):
+                self.remove_task_view(row_index)
+            for j in range(j1, j2):
+                self.create_task_view(wanted[j], i1 + 1 + j - j1)
+        self.first = first
+        self.last = last
+        self.update_spacers()
+        # Rows of selected tasks may have been recreated
+        board = self.board.board
+        for task in selected_tasks:
+            if board.find_tasklist(task.id) is self.tasklist:
+                task_view = self.get_task_view(tasks.index(task))
+                if task_view is not None and not task_view.is_selected():
+                    self.select_row(task_view)
+
+    # Rows follow the task list, the methods below only change the model
+    def on_model_change(self, change):
+        if change.kind == "insert":
+            self.on_task_inserted(change.task, change.index)
+        elif change.kind == "remove":
+            self.on_task_removed(change.index)
+        elif change.kind == "move":
+            self.on_task_removed(change.index)
+            self.on_task_inserted(change.task, change.new_index)
+        elif change.kind == "update":
+            task_view = self.get_task_view(change.index)
+            if task_view is not None and task_view.task is change.task:
+                task_view.refresh()
+        self.update_spacers()
+
+    def on_task_inserted(self, task, index):
+        if index < self.first or (index == self.first and self.first > 0):
+            self.first += 1
+            self.last += 1
+        elif index <= self.last:
+            self.create_task_view(task, index - self.first + 1)
+            self.last += 1
+
+    def on_task_removed(self, index):
+        if index < self.first:
+            self.first -= 1
+            self.last -= 1
+        elif index < self.last:
+            self.remove_task_view(index - self.first + 1)
+            self.last -= 1
+
+    def add_task(self, task):
+        self.tasklist.add(task)
+
+    def remove_task(self, task_view):
+        return self.tasklist.remove(self.get_task_index(task_view))
+
+    def move_task(self, task_view, index):
+        self.tasklist.move(self.get_task_index(task_view), index)
+
+    def select_task(self, index):
+        if index < len(self.tasklist.tasks):
+            row = self.show_task(index)
+        else:
+            # NewTask
+            row = self.get_row_at_index(self.last - self.first + 2)
+        self.select_only(row)
+        row.grab_focus()
+
+    def select_only(self, row):
+        self.unselect_all()
+        self.select_row(row)
+
+    def select_tasks(self, tasks):
+        self.unselect_all()
+        for task in tasks:
+            row = self.show_task(self.tasklist.tasks.index(task))
+            self.select_row(row)
+        row.grab_focus()
+
+    # Keyboard moves, all selected tasks move in one batch
+    def move_selected(self, positions):
+        """Move the selected tasks, positions gives the new index of each
+        one, in the order they are moved."""
+        tasks = self.get_selected_tasks()
+        if len(tasks) == 0:
             return
-        position = task.get_index()
-        if position > 0:
-            self.unselect_row(task)
-            self.remove_task(task)
-            self.insert_task(task, position - 1)
-            self.select_row(task)
-            task.grab_focus()
+        self.unselect_all()
+        with self.board.board.batch():
+            for task, position in positions(tasks):
+                self.tasklist.move(self.tasklist.tasks.index(task), position)
+        self.select_tasks(tasks)
+
+    def move_up(self):
+        def positions(tasks):
+            index = self.tasklist.tasks.index(tasks[0])
+            if index > 0:
+                for task in tasks:
+                    index = self.tasklist.tasks.index(task)
+                    yield task, index - 1
+        self.move_selected(positions)
 
     def move_down(self):
-        task = self.get_selected_row()
-        if task is None:
-            return
-        position = task.get_index()
-        if position < len(self.tasklist.tasks) - 1:
-            self.unselect_row(task)
-            self.remove_task(task)
-            self.insert_task(task, position + 1)
-            self.select_row(task)
-            task.grab_focus()
+        def positions(tasks):
+            last = len(self.tasklist.tasks) - 1
+            if self.tasklist.tasks.index(tasks[-1]) < last:
+                for task in reversed(tasks):
+                    index = self.tasklist.tasks.index(task)
+                    yield task, index + 1
+        self.move_selected(positions)
 
     def move_top(self):
-        task = self.get_selected_row()
-        if task is None:
-            return
-        position = task.get_index()
-        if position > 0:
-            self.unselect_row(task)
-            self.remove_task(task)
-            self.insert_task(task, 0)
-            self.select_row(task)
-            task.grab_focus()
+        self.move_selected(lambda tasks: zip(tasks, range(len(tasks))))
 
     def move_bottom(self):
-        task = self.get_selected_row()
-        if task is None:
-            return
-        position = task.get_index()
-        lastelem = len(self.tasklist.tasks) - 1
-        if position < lastelem:
-            self.unselect_row(task)
-            self.remove_task(task)
-            self.insert_task(task, lastelem)
-            self.select_row(task)
-            task.grab_focus()
-
-    def move_to_next_list(self, listname):
-        if self.get_title() != listname:
-            return
-        task = self.get_selected_row()
-        if task is None:
-            return
-        current_list_index = self.board.get_list_index(self.get_title())
-        if current_list_index + 1 >= len(self.board.lists):
-            return
-        next_list = self.board.get_list(current_list_index + 1).get_tasklist()
-        self.unselect_row(task)
-        self.remove_task(task)
-        next_list.insert_task(task, 0)
-        next_list.select_row(task)
-        task.grab_focus()
-
-    def move_to_prev_list(self, listname):
-        if self.get_title() != listname:
-            return
-        task = self.get_selected_row()
-        if task is None:
+        last = len(self.tasklist.tasks) - 1
+        self.move_selected(lambda tasks: zip(reversed(tasks),
+                                             range(last, -1, -1)))
+
+    def move_to_list(self, offset):
+        tasks = self.get_selected_tasks()
+        if len(tasks) == 0:
             return
-        current_list_index = self.board.get_list_index(self.get_title())
-        if current_list_index == 0:
+        index = self.board.get_list_index(self.get_id()) + offset
+        if index < 0 or index >= len(self.board.lists):
             return
-        prev_list = self.board.get_list(current_list_index - 1).get_tasklist()
-        self.unselect_row(task)
-        self.remove_task(task)
-        prev_list.insert_task(task, 0)
-        prev_list.select_row(task)
-        task.grab_focus()
+        other_list = self.board.get_list(index).get_tasklist()
+        self.unselect_all()
+        with self.board.board.batch():
+            for position, task in enumerate(tasks):
+                task = self.tasklist.remove(self.tasklist.tasks.index(task))
+                other_list.tasklist.insert(position, task)
+        other_list.select_tasks(tasks)
 
-    def on_task_modified(self, widget, title):
-        self.emit("modified")
+    def move_to_next_list(self):
+        self.move_to_list(1)
+
+    def move_to_prev_list(self):
+        self.move_to_list(-1)
 
     def on_task_delete(self, widget):
-        index = widget.get_index()
+        index = self.get_task_index(widget)
         if index > 0:
             index -= 1
         self.remove_task(widget)
-        row = self.get_row_at_index(index)
-        self.select_row(row)
-        row.grab_focus()
+        self.select_task(index)
 
-    # Drag and Drop
-    def set_drag_and_drop(self, task_view):
-        task_view.target_entry = Gtk.TargetEntry.new(
-            "GTK_LIST_BOX_ROW", Gtk.TargetFlags.SAME_APP, 0)
-        task_view.drag_handle.drag_source_set(Gdk.ModifierType.BUTTON1_MASK, [
-            task_view.target_entry], Gdk.DragAction.MOVE)
-        task_view.drag_handle.connect("drag-begin", self.on_drag_begin)
-        task_view.drag_handle.connect("drag-data-get", self.on_drag_data_get)
-        task_view.drag_dest_set(Gtk.DestDefaults.ALL, [
-            task_view.target_entry], Gdk.DragAction.MOVE)
-        task_view.connect("drag-data-received", self.on_drag_data_received)
-
-    def on_drag_begin(self, widget, drag_context):
-        row = widget.get_ancestor(TaskView)
-        listbox = row.get_parent()
-        listbox.select_row(row)
-        surface = cairo.ImageSurface(
-            cairo.Format.ARGB32, row.get_allocated_width(), row.get_allocated_height())
-        context = cairo.Context(surface)
-        row.draw(context)
-        Gtk.drag_set_icon_surface(drag_context, surface)
-
-    def on_drag_data_received(self, widget, drag_context, x, y, data, info, time):
-        board = widget.get_ancestor(TaskListView).get_board()
-        source_info = pickle.loads(data.get_data())
-        source_list_index = board.get_list_index(source_info["list"])
-        source_list = board.get_list(source_list_index).get_tasklist()
-        target = widget
-        target_list = target.get_ancestor(TaskListView)
-        if source_info["index"] == target.get_index() and source_info["list"] == target_list.get_title():
+    def on_task_dropped(self, widget, task_ids):
+        board = self.board.board
+        tasks = [board.find(task_id) for task_id in task_ids]
+        if None in tasks or widget.task in tasks:
             return
-        source = source_list.get_row_at_index(source_info["index"])
-        position = target.get_index()
-        source_list.remove_task(source)
-        target_list.insert_task(source, position)
-
-    def on_drag_data_get(self, widget, drag_context, data, info, time):
-        info = dict()
-        info["list"] = widget.get_ancestor(TaskListView).get_title()
-        info["index"] = widget.get_ancestor(TaskView).get_index()
-        data.set(Gdk.Atom.intern_static_string(
-            "GTK_LIST_BOX_ROW"), 32, pickle.dumps(info))
+        # The first dropped task takes the place of the target row, dropped
+        # tasks above the target move it up except the one taking its place
+        position = self.tasklist.tasks.index(widget.task)
+        above = [task for task in tasks
+                 if board.find_tasklist(task.id) is self.tasklist and
+                 self.tasklist.tasks.index(task) < position]
+        position -= max(0, len(above) - 1)
+        self.unselect_all()
+        # The source rows may be gone if their list scrolled during the drag
+        with board.batch():
+            for task in tasks:
+                source_list = board.find_tasklist(task.id)
+                source_list.remove(source_list.tasks.index(task))
+            for i, task in enumerate(tasks):
+                self.tasklist.insert(position + i, task)
+        self.select_tasks(tasks)
 
     def on_new_task_enter(self, widget):
         self.board.remove_noneditable_accelerators()
@@ -26,12 +26,41 @@
 # use or other dealings in this Software without prior written
 # authorization.
 
+import cairo
+from collections import OrderedDict
 from gi.repository import Gtk, Gdk, GObject, Pango, GLib
 from .gi_composites import GtkTemplate
 
 from .Task import Task
+from .DueIndex import due_priority
+from .ids import ID_LENGTH, encode_id, decode_id
 from .TextEntry import TextEntry, ActivableTextEntry
 
+# Drag and drop payload of tasks, see encode_ids
+DRAG_TARGET = "application/x-kanban-task-ids"
+# Drag icons kept, by row content and size
+DRAG_ICONS_SIZE = 32
+drag_icons = OrderedDict()
+
+
+def encode_ids(ids):
+    """Drag and drop payload of task ids, ID_LENGTH ascii characters each.
+    Unlike a pickle, decoding it runs no code from the sender."""
+    return "".join(encode_id(i) for i in ids).encode("ascii")
+
+
+def decode_ids(data):
+    """Task ids of an encode_ids payload, none if data is not one."""
+    if data is None or len(data) % ID_LENGTH != 0:
+        return []
+    try:
+        text = data.decode("ascii")
+        return [decode_id(text[i:i + ID_LENGTH])
+                for i in range(0, len(text), ID_LENGTH)]
+    except ValueError:
+        return []
+
+
 #TODO use GtkTemplate
 class TaskEditDialog(Gtk.Dialog):
 
@@ -127,12 +156,12 @@ class TaskEditDialog(Gtk.Dialog):
 
     def on_response(self, widget, response):
         if response == Gtk.ResponseType.APPLY:
-            self.task.title = self.entry.get_text()
+            self.task.set_title(self.entry.get_text())
             y, m, d = self.calendar.get_date()
             if d != 0:
                 self.task.set_due_date(y, m + 1, d)
             else:
-                self.task.due_date = None
+                self.task.clear_due_date()
 
 
 @GtkTemplate(ui='/org/gnome/kanban/ui/task.ui')
@@ -141,7 +170,9 @@ class TaskView(Gtk.ListBoxRow):
 
     __gsignals__ = {
         "modified": (GObject.SIGNAL_RUN_FIRST, None, (str,)),
-        "delete": (GObject.SIGNAL_RUN_FIRST, None, ())
+        "delete": (GObject.SIGNAL_RUN_FIRST, None, ()),
+        # Ids of the tasks dropped on this row
+        "dropped": (GObject.SIGNAL_RUN_FIRST, None, (GObject.TYPE_PYOBJECT,))
     }
 
     drag_handle, \
@@ -151,19 +182,37 @@ class TaskView(Gtk.ListBoxRow):
         deletebutton, \
         due_date = GtkTemplate.Child().widgets(6)
 
-    def __init__(self, task, board):
+    def __init__(self, clock):
         super().__init__()
         self.init_template()
-        self.task = task
+        self.clock = clock
+        self.task = None
+        # Task state the row was drawn from, see is_stale
+        self.shown = None
+        self.priority = None
         self.connect("modified", lambda widget,
                      title: self.task.set_title(title))
         self.connect("key-press-event", self.on_key_press)
         self.editbutton.connect("clicked", self.on_edit_clicked)
         self.deletebutton.connect("clicked", lambda w: self.emit("delete"))
+        self.set_drag_and_drop()
+
+    def bind(self, task):
+        """Show task in this row, rows are reused for different tasks, see
+        TaskViewPool."""
+        self.task = task
         self.refresh()
 
+    def unbind(self):
+        self.task = None
+        self.shown = None
+
+    def is_stale(self):
+        return self.shown != (self.task.title, self.task.due_date)
+
     def refresh(self):
         task = self.task
+        self.shown = (task.title, task.due_date)
         # entry
         self.label.set_text(task.title)
         # due date
@@ -172,19 +221,15 @@ class TaskView(Gtk.ListBoxRow):
         sc.remove_class("priority-medium")
         sc.remove_class("priority-high")
         if hasattr(task, "due_date") and task.due_date is not None:
-            date = GLib.DateTime.new_local(
-                task.due_date.year, task.due_date.month, task.due_date.day, 0, 0, 0)
-            self.due_date.set_text(date.format("%e %b"))
-            todaytime = GLib.DateTime.new_now_local()
-            timediff = date.difference(todaytime) / (24 * 60 * 60 * 1000000)
-            if timediff < 1:
-                sc.add_class("priority-high")
-            elif timediff < 2:
-                sc.add_class("priority-medium")
-            elif timediff < 3:
-                sc.add_class("priority-low")
+            ordinal = task.due_date.ordinal
+            self.due_date.set_text(self.clock.format_day(ordinal))
+            priority = due_priority(ordinal, self.clock.today)
+            if priority is not None:
+                sc.add_class("priority-" + priority)
         else:
             self.due_date.set_text("")
+            priority = None
+        self.priority = priority
         self.show_all()
 
     def on_modified(self, widget, title):
@@ -200,10 +245,58 @@ class TaskView(Gtk.ListBoxRow):
         elif k == Gdk.KEY_Delete:
             self.deletebutton.clicked()
 
+    # Drag and Drop
+    def set_drag_and_drop(self):
+        self.target_entry = Gtk.TargetEntry.new(
+            DRAG_TARGET, Gtk.TargetFlags.SAME_APP, 0)
+        self.drag_handle.drag_source_set(Gdk.ModifierType.BUTTON1_MASK, [
+            self.target_entry], Gdk.DragAction.MOVE)
+        self.drag_handle.connect("drag-begin", self.on_drag_begin)
+        self.drag_handle.connect("drag-data-get", self.on_drag_data_get)
+        self.drag_dest_set(Gtk.DestDefaults.ALL, [
+            self.target_entry], Gdk.DragAction.MOVE)
+        self.connect("drag-data-received", self.on_drag_data_received)
+
+    def get_drag_icon(self):
+        width = self.get_allocated_width()
+        height = self.get_allocated_height()
+        settings = Gtk.Settings.get_default()
+        # Selected and hovered rows, and other themes, are drawn differently
+        key = (self.task.title, self.due_date.get_text(), self.priority,
+               width, height, self.get_state_flags(),
+               settings.props.gtk_theme_name,
+               settings.props.gtk_application_prefer_dark_theme)
+        surface = drag_icons.get(key)
+        if surface is None:
+            surface = cairo.ImageSurface(cairo.Format.ARGB32, width, height)
+            self.draw(cairo.Context(surface))
+            drag_icons[key] = surface
+            if len(drag_icons) > DRAG_ICONS_SIZE:
+                drag_icons.popitem(last=False)
+        else:
+            drag_icons.move_to_end(key)
+        return surface
+
+    def on_drag_begin(self, widget, drag_context):
+        # A selected row drags all the selected rows along
+        if not self.is_selected():
+            self.get_parent().select_only(self)
+        Gtk.drag_set_icon_surface(drag_context, self.get_drag_icon())
+
+    def on_drag_data_get(self, widget, drag_context, data, info, time):
+        tasks = self.get_parent().get_selected_tasks()
+        if self.task not in tasks:
+            tasks = [self.task]
+        data.set(Gdk.Atom.intern_static_string(DRAG_TARGET), 8,
+                 encode_ids([t.id for t in tasks]))
+
+    def on_drag_data_received(self, widget, drag_context, x, y, data, info, time):
+        task_ids = decode_ids(data.get_data())
+        if len(task_ids) > 0:
+            self.emit("dropped", task_ids)
+
     def on_edit_clicked(self, button):
         dialog = TaskEditDialog(self.get_ancestor(Gtk.Window), self.task)
-        response = dialog.run()
-        if response == Gtk.ResponseType.APPLY:
-            self.emit("modified", self.task.title)
-            self.refresh()
+        # The dialog changes the task, the list view refreshes this row
+        dialog.run()
         dialog.destroy()
@@ -0,0 +1,61 @@
+# TaskViewPool.py
+#
+# Copyright (C) 2018 Pawel Jakubowski
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE X CONSORTIUM BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# Except as contained in this notice, the name(s) of the above copyright
+# holders shall not be used in advertising or otherwise to promote the sale,
+# use or other dealings in this Software without prior written
+# authorization.
+
+from .TaskView import TaskView
+
+
+class TaskViewPool:
+    """Reusable TaskView rows, shared by all the lists of the window.
+
+    Rows scrolled out of a list or left behind by a closed board are
+    kept and bound to other tasks, instead of building a new widget
+    from the template every time.
+    """
+
+    def __init__(self, clock, limit=500):
+        self.clock = clock
+        self.limit = limit
+        self.views = []
+
+    def acquire(self, task):
+        if len(self.views) > 0:
+            view = self.views.pop()
+        else:
+            view = TaskView(self.clock)
+        view.bind(task)
+        return view
+
+    def release(self, view):
+        view.unbind()
+        if len(self.views) < self.limit:
+            self.views.append(view)
+        else:
+            view.destroy()
+
+    def __len__(self):
+        return len(self.views)
@@ -30,14 +30,21 @@ from gi.repository import Gtk, Gio, GLib
 from .gi_composites import GtkTemplate
 
 from .BoardView import BoardView
+from .BoardViewCache import BoardViewCache
 from .BoardListView import BoardListView
+from .TaskViewPool import TaskViewPool
 from .settings import KanbanSettings
+from .sqlite_settings import SqliteSettings
+from .saver import SaveScheduler
+from .clock import Clock
 
 
 @GtkTemplate(ui='/org/gnome/kanban/ui/window.ui')
 class KanbanWindow(Gtk.ApplicationWindow):
     __gtype_name__ = 'KanbanWindow'
 
+    stack = GtkTemplate.Child()
+
     def __init__(self, config_dir, **kwargs):
         super().__init__(**kwargs)
         self.init_template()
@@ -46,13 +53,26 @@ class KanbanWindow(Gtk.ApplicationWindow):
         self.add_accel_group(self.accelerators)
         self.settings = Gio.Settings.new("org.gnome.kanban")
         self.connect("configure-event", lambda w, e: self.save_window_info())
-        self.user_settings = KanbanSettings(config_dir)
+        if self.settings.get_string("storage-backend") == "sqlite":
+            self.user_settings = SqliteSettings(config_dir)
+        else:
+            self.user_settings = KanbanSettings(config_dir)
+        self.saver = SaveScheduler(self.user_settings)
+        self.connect("delete-event", lambda w, e: self.saver.flush())
+        self.clock = Clock()
+        self.task_views = TaskViewPool(self.clock)
+        self.board_views = BoardViewCache(
+            self.stack, self.settings.get_int("board-cache-rows"),
+            self.settings.get_int("board-cache-views"),
+            self.user_settings.boards)
         self.load_settings()
 
     def draw_boards_list(self):
         self.clean()
         blv = BoardListView(self.user_settings, self)
-        self.add(blv)
+        self.stack.add(blv)
+        self.stack.set_visible_child(blv)
+        self.board_views.evict()
         self.active_board = ""
         self.show_all()
         if len(blv.list.get_children()) > 0:
@@ -61,15 +81,30 @@ class KanbanWindow(Gtk.ApplicationWindow):
             first_elem.grab_focus()
 
     def draw_board(self, name):
+        board = self.user_settings.boards[name]
         self.clean()
-        boardview = BoardView(self.user_settings.boards[name], self)
-        self.add(boardview)
+        boardview = self.board_views.get(name)
+        if boardview is not None and boardview.board is not board:
+            # The board was replaced, e.g. by an import
+            self.board_views.remove(name)
+            boardview = None
+        if boardview is None:
+            boardview = BoardView(board, self)
+            self.board_views.add(name, boardview)
+        else:
+            # Only the changed rows are updated
+            boardview.reconcile()
+            self.set_titlebar(boardview.headerbar)
+        boardview.show_all()
+        self.stack.set_visible_child(boardview)
+        self.board_views.evict()
         self.active_board = name
         self.show_all()
 
     def clean(self):
-        child = self.get_child()
-        if child is not None:
+        # Board views stay in the stack, see BoardViewCache
+        child = self.stack.get_visible_child()
+        if child is not None and not isinstance(child, BoardView):
             child.destroy()
 
     def bind_accelerator(self, widget, accelerator, signal='clicked'):
@@ -0,0 +1,105 @@
+# test_batch.py
+#
+# Copyright (C) 2018 Pawel Jakubowski
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE X CONSORTIUM BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# Except as contained in this notice, the name(s) of the above copyright
+# holders shall not be used in advertising or otherwise to promote the sale,
+# use or other dealings in this Software without prior written
+# authorization.
+
+# Observers of Board.batch() get the changes after the whole batch ran
+import os
+import sys
+import types
+import unittest
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+package = types.ModuleType("kanban")
+package.__path__ = [os.path.join(SRC, d) for d in ("model", "", "importer")]
+sys.modules.setdefault("kanban", package)
+
+from kanban.Board import Board
+from kanban.Task import Task
+
+
+def make_task(title, day):
+    task = Task(title)
+    task.set_due_date(2018, 1, day)
+    return task
+
+
+class BatchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.board = Board("b")
+        self.board.add_new("Existing").add(make_task("old", 1))
+        # Build the indexes first, so they follow the changes
+        self.board.due()
+        self.board.search("old")
+
+    def assert_indexed_once(self):
+        tasks = [t for l in self.board.tasklists for t in l.tasks]
+        due = self.board.due()
+        self.assertEqual(sorted(due.keys),
+                         sorted((t.due_date.ordinal, t.id) for t in tasks))
+        for t in tasks:
+            self.assertEqual(self.board.search(t.title), [t.id])
+
+    def test_list_insert_then_insert(self):
+        with self.board.batch():
+            tasklist = self.board.add_new("New")
+            tasklist.add(make_task("first", 2))
+            tasklist.add(make_task("second", 3))
+        self.assert_indexed_once()
+
+    def test_list_insert_then_move_out(self):
+        existing = self.board.tasklists[0]
+        with self.board.batch():
+            tasklist = self.board.add_new("New")
+            tasklist.add(make_task("first", 2))
+            existing.add(tasklist.remove(0))
+            tasklist.add(existing.remove(0))
+        self.assert_indexed_once()
+
+    def test_list_insert_then_list_remove(self):
+        with self.board.batch():
+            tasklist = self.board.add_new("New")
+            tasklist.add(make_task("first", 2))
+            self.board.remove_tasklist(tasklist)
+        self.assert_indexed_once()
+
+    def test_update_carries_index(self):
+        existing = self.board.tasklists[0]
+        changes = []
+        self.board.subscribe(changes.extend)
+        with self.board.batch():
+            existing.insert(0, Task("new"))
+            task = existing.tasks[1]
+            task.set_title("renamed")
+            existing.remove(1)
+        update = [c for c in changes if c.kind == "update"][0]
+        self.assertIs(update.task, task)
+        self.assertEqual(update.index, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
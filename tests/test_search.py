@@ -0,0 +1,117 @@
+# test_search.py
+#
+# Copyright (C) 2018 Pawel Jakubowski
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE X CONSORTIUM BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# Except as contained in this notice, the name(s) of the above copyright
+# holders shall not be used in advertising or otherwise to promote the sale,
+# use or other dealings in this Software without prior written
+# authorization.
+
+# Search index built in steps and ranking of multi word queries
+import os
+import sys
+import types
+import random
+import unittest
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+package = types.ModuleType("kanban")
+package.__path__ = [os.path.join(SRC, d) for d in ("model", "", "importer")]
+sys.modules.setdefault("kanban", package)
+
+from kanban.Board import Board
+from kanban.Task import Task
+from kanban.SearchIndex import tokenize
+
+WORDS = ["ra", "rapa", "vo", "vodo", "ti", "tika", "mu", "ramu"]
+
+
+def relevance(term, task):
+    # Reference scoring, see SearchIndex
+    title = tokenize(task.title)
+    description = tokenize(getattr(task, "description", None))
+    if term in title:
+        return 4
+    if any(token.startswith(term) for token in title):
+        return 3
+    if term in description:
+        return 2
+    if any(token.startswith(term) for token in description):
+        return 1
+    return 0
+
+
+def make_board(rng, count):
+    board = Board("b")
+    for i in range(3):
+        tasklist = board.add_new("List %d" % i)
+        for j in range(count // 3):
+            task = Task(" ".join(rng.choice(WORDS)
+                                 for _ in range(rng.randint(1, 3))))
+            if j % 2 == 0:
+                task.description = " ".join(
+                    rng.choice(WORDS) for _ in range(rng.randint(1, 4)))
+            tasklist.add(task)
+    return board
+
+
+class SearchTest(unittest.TestCase):
+
+    def test_multi_word_ranking(self):
+        rng = random.Random(1)
+        board = make_board(rng, 600)
+        tasks = [t for l in board.tasklists for t in l.tasks]
+        for query in ("ra vo", "rapa ti", "r v t", "mu ra", "vodo tika ra"):
+            terms = tokenize(query)
+            expected = []
+            for task in sorted(tasks, key=lambda t: t.id):
+                scores = [relevance(term, task) for term in terms]
+                if 0 not in scores:
+                    expected.append((-sum(scores), len(expected), task.id))
+            expected = [item[2] for item in sorted(expected)[:20]]
+            self.assertEqual(board.search(query, 20), expected, query)
+
+    def test_index_built_in_steps_follows_changes(self):
+        rng = random.Random(2)
+        board = make_board(rng, 300)
+        self.assertTrue(board.index_tasks(100))
+        first, second, third = board.tasklists
+        # Tasks not indexed yet are removed, edited and moved
+        removed = third.tasks[5]
+        third.remove(5)
+        third.tasks[0].set_title("zebra")
+        task = third.tasks[1]
+        third.remove(1)
+        first.insert(0, task)
+        second.add(Task("yak"))
+        while board.index_tasks(100):
+            pass
+        tasks = [t for l in board.tasklists for t in l.tasks]
+        self.assertEqual(len(board.search_index), len(tasks))
+        self.assertEqual(board.search("zebra"), [third.tasks[0].id])
+        self.assertEqual(board.search("yak"), [second.tasks[-1].id])
+        self.assertNotIn(removed.id, board.search(removed.title, 1000))
+        self.assertIn(task.id, board.search(task.title, 1000))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,213 @@
+# test_settings.py
+#
+# Copyright (C) 2018 Pawel Jakubowski
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE X CONSORTIUM BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# Except as contained in this notice, the name(s) of the above copyright
+# holders shall not be used in advertising or otherwise to promote the sale,
+# use or other dealings in this Software without prior written
+# authorization.
+
+# Decoding of boards saved by this and older versions
+import os
+import sys
+import types
+import pickle
+import tempfile
+import unittest
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+package = types.ModuleType("kanban")
+package.__path__ = [os.path.join(SRC, d) for d in ("model", "", "importer")]
+sys.modules.setdefault("kanban", package)
+
+from kanban.settings import KanbanSettings, decode_task
+from kanban.sqlite_settings import SqliteSettings
+from kanban.Board import Board
+from kanban.Task import Task, DueDate
+
+
+def write_legacy_pickle(path):
+    # Boards of the first versions were pickled from a 'model' package with
+    # plain classes and a dict of four lists
+    modules = {name: types.ModuleType("model." + name)
+               for name in ("Board", "TaskList", "Task")}
+
+    class DueDate:
+        def __init__(self, year, month, day):
+            self.year, self.month, self.day = year, month, day
+
+    class Task:
+        def __init__(self, title):
+            self.title = title
+            self.creation_date = self.update_date = 1.0
+            self.due_date = None
+
+    class TaskList:
+        def __init__(self, title):
+            self.title = title
+            self.tasks = []
+
+    class Board:
+        def __init__(self, title):
+            self.title = title
+            self.tasklists = dict()
+
+    for cls, module in ((DueDate, "Task"), (Task, "Task"),
+                        (TaskList, "TaskList"), (Board, "Board")):
+        cls.__module__ = "model." + module
+        cls.__qualname__ = cls.__name__
+        setattr(modules[module], cls.__name__, cls)
+    board = Board("Old")
+    for title in ("Backlog", "Ready", "Doing", "Done"):
+        board.tasklists[title] = TaskList(title)
+    task = Task("legacy")
+    task.due_date = DueDate(2018, 5, 6)
+    board.tasklists["Ready"].tasks.append(task)
+    names = ["model"] + ["model." + name for name in modules]
+    saved = {name: sys.modules.get(name) for name in names}
+    sys.modules["model"] = types.ModuleType("model")
+    sys.modules.update(("model." + name, module)
+                       for name, module in modules.items())
+    try:
+        with open(path, "wb") as f:
+            pickle.dump(board, f)
+    finally:
+        for name, module in saved.items():
+            if module is None:
+                del sys.modules[name]
+            else:
+                sys.modules[name] = module
+
+
+class DecodeTaskTest(unittest.TestCase):
+
+    def test_importer_attributes_without_standard_keys(self):
+        # Older files have no id and no position
+        task = decode_task({"title": "a", "creation_date": 1.0,
+                            "update_date": 1.0, "due_date": None,
+                            "description": "keep me", "labels": []})
+        self.assertEqual(task.description, "keep me")
+        self.assertEqual(task.labels, [])
+
+
+class AgendaTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.config_dir = self.tmp.name + "/"
+        settings = KanbanSettings(self.config_dir, parallel_load=False)
+        for title, due in (("soon", (2020, 1, 2)), ("later", (2020, 3, 1)),
+                           ("never", None)):
+            board = Board(title)
+            tasklist = board.add_new("todo")
+            task = Task(title)
+            if due is not None:
+                task.due_date = DueDate(*due)
+            tasklist.add(task)
+            settings.add_board(board)
+        settings.save()
+        # Boards are decoded on first access once the manifest is written
+        settings = KanbanSettings(self.config_dir, parallel_load=False)
+        settings.load()
+        self.settings = KanbanSettings(self.config_dir, parallel_load=False)
+        self.settings.load()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_agenda_decodes_only_boards_with_tasks_due(self):
+        today = DueDate(2020, 1, 1).ordinal
+        agenda = self.settings.agenda(7, today)
+        self.assertEqual([task.title for board, task in agenda], ["soon"])
+        self.assertEqual(sorted(self.settings.boards.loaded), ["soon"])
+
+    def test_agenda_of_loaded_boards(self):
+        self.settings.boards["never"]
+        self.settings.boards["later"]
+        today = DueDate(2020, 2, 28).ordinal
+        agenda = self.settings.agenda(7, today)
+        self.assertEqual([task.title for board, task in agenda],
+                         ["soon", "later"])
+
+
+class ManifestTest(unittest.TestCase):
+
+    def test_counts_are_taken_with_the_snapshot(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            settings = KanbanSettings(tmp + "/", parallel_load=False)
+            board = Board("b")
+            board.add_new("todo").add(Task("a"))
+            settings.add_board(board)
+            snapshots = settings.take_snapshots()
+            # The board keeps changing while the worker thread writes
+            board.add_new("done").add(Task("b"))
+            settings.write_snapshots(snapshots)
+            entry, = settings.manifest.values()
+            self.assertEqual((entry["title"], entry["lists"], entry["tasks"]),
+                             ("b", 1, 1))
+
+
+class LegacyPickleTest(unittest.TestCase):
+
+    def test_pickled_board_is_converted_to_json(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            config_dir = tmp + "/"
+            write_legacy_pickle(config_dir + "Old.pkl")
+            settings = KanbanSettings(config_dir, parallel_load=False)
+            settings.load()
+            self.assertTrue(os.path.exists(config_dir + "Old.json"))
+            # Made of the classes of this package, not the pickled copies
+            self.assertIsInstance(
+                settings.boards["Old"].tasklists[1].tasks[0], Task)
+            settings = KanbanSettings(config_dir, parallel_load=False)
+            settings.load()
+            board = settings.boards["Old"]
+            self.assertEqual([l.title for l in board.tasklists],
+                             ["Backlog", "Ready", "Doing", "Done"])
+            task = board.tasklists[1].tasks[0]
+            self.assertEqual(task.title, "legacy")
+            self.assertEqual(task.due_date.ordinal,
+                             DueDate(2018, 5, 6).ordinal)
+
+
+    def test_pickled_board_is_migrated_to_sqlite(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            config_dir = tmp + "/"
+            write_legacy_pickle(config_dir + "Old.pkl")
+            settings = SqliteSettings(config_dir)
+            settings.load()
+            # The board, its four lists and the task
+            self.assertEqual(settings.saved_rows, 6)
+            self.assertTrue(os.path.exists(config_dir + "kanban.db"))
+            settings = SqliteSettings(config_dir)
+            settings.load()
+            board = settings.boards["Old"]
+            self.assertEqual([l.title for l in board.tasklists],
+                             ["Backlog", "Ready", "Doing", "Done"])
+            task = board.tasklists[1].tasks[0]
+            self.assertEqual(task.title, "legacy")
+            self.assertEqual(task.due_date.ordinal,
+                             DueDate(2018, 5, 6).ordinal)
+
+
+if __name__ == "__main__":
+    unittest.main()